@@ -1,6 +1,8 @@
 from datetime import datetime
 import os
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
 import regex as re
 
 
@@ -8,24 +10,63 @@ class CSVLoader:
     def __init__(self, folder_path):
         self.folder_path = folder_path
     
-    def load_csv_files(self):
-        """Load all CSV files from the folder and return a list of tuples (filename, datetime object, dataframe)."""
-        dataframes = []
+    """
+    Types of the option minute csv columns, given to the pyarrow reader so no column has to
+    be inferred. Strike is a float so stock options with half strikes (142.5) parse too.
+    """
+    column_types = {
+        'Ticker': pa.string(),
+        'Expiry': pa.string(),
+        'Strike': pa.float64(),
+        'Contract_Monthly': pa.string(),
+        'Contract_Weekly': pa.string(),
+        'Date': pa.string(),
+        'Time': pa.string(),
+        'Open': pa.float64(),
+        'High': pa.float64(),
+        'Low': pa.float64(),
+        'Close': pa.float64(),
+        'Volume': pa.int64(),
+        'OI': pa.int64(),
+        'Type': pa.string(),
+        'Script': pa.string(),
+    }
+
+    def iter_csv_files(self):
+        """Yield (filename, datetime object, file path) for every DD-MM-YYYY.csv in the folder, oldest first."""
         pattern = r"(\d{2})-(\d{2})-(\d{4})\.csv"
-        
+        files = []
+
         for filename in os.listdir(self.folder_path):
             match = re.match(pattern, filename)
             if match:
                 day, month, year = match.groups()
                 file_date = datetime.strptime(f"{day}-{month}-{year}", "%d-%m-%Y")
-                file_path = os.path.join(self.folder_path, filename)
-                df = pd.read_csv(file_path)
-                dataframes.append((filename, file_date, df))
-        
-        return dataframes
+                files.append((file_date, filename))
+
+        for file_date, filename in sorted(files):
+            yield filename, file_date, os.path.join(self.folder_path, filename)
+
+    def load_csv_files(self):
+        """Load all CSV files from the folder and return a list of tuples (filename, datetime object, dataframe)."""
+        return [(filename, file_date, pd.read_csv(file_path))
+                for filename, file_date, file_path in self.iter_csv_files()]
+
+    @classmethod
+    def read_csv_file(cls, file_path):
+        """Parse one csv with the multithreaded pyarrow reader and the explicit column types."""
+        table = pacsv.read_csv(file_path,
+                               convert_options = pacsv.ConvertOptions(column_types = cls.column_types))
+        return table.to_pandas()
 
     def process_dataframe(self, df):
         """Clean and preprocess the dataframe."""
         df['datetime'] = pd.to_datetime(df['Date'] + ' ' + df['Time'])
         df.drop(['Date', 'Time'], axis=1, inplace=True)
         return df
+
+
+def parse_csv_file(file_path):
+    """Process pool task: read and process one csv, only the processed dataframe is sent back."""
+    loader = CSVLoader(os.path.dirname(file_path))
+    return loader.process_dataframe(loader.read_csv_file(file_path))
@@ -0,0 +1,117 @@
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+
+
+
+class IngestManifest:
+    """
+    JSON record of the csv files already ingested, kept next to the data so a re-run only
+    processes new or changed files:
+
+    {"files": {"DD-MM-YYYY.csv": {"file_date", "sha256", "size", "mtime", "rows",
+                                  "batch_key", "batches_committed", "complete", "ingested_at"}}}
+
+    A file counts as unchanged when it was completed with the same size and mtime, or the
+    same sha256 when only the mtime moved (a copy or touch). An interrupted file keeps the
+    number of batches committed so the next run resumes after them. Every change is written
+    to a temporary file and renamed over the manifest, so a crash never leaves it half written.
+    """
+    def __init__(self, manifest_path):
+        self.manifest_path = manifest_path
+        self.lock = threading.Lock()
+        self.files = {}
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                self.files = json.load(f).get('files', {})
+
+    @staticmethod
+    def file_hash(file_path, chunk_size = 1 << 20):
+        """sha256 of the file read in chunks."""
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def signature(self, file_path, with_hash = True):
+        stat = os.stat(file_path)
+        signature = {'size': stat.st_size, 'mtime': stat.st_mtime_ns}
+        if with_hash:
+            signature['sha256'] = self.file_hash(file_path)
+        return signature
+
+    def is_current(self, filename, file_path):
+        """True when the file was completely ingested and has not changed since."""
+        with self.lock:
+            entry = dict(self.files.get(filename, {}))
+        if not entry.get('complete'):
+            return False
+
+        signature = self.signature(file_path, with_hash = False)
+        if signature['size'] != entry['size']:
+            return False
+        if signature['mtime'] == entry['mtime']:
+            return True
+
+        if self.file_hash(file_path) != entry['sha256']:
+            return False
+        with self.lock:
+            self.files[filename]['mtime'] = signature['mtime']
+            self.save()
+        return True
+
+    def start_file(self, filename, file_path, file_date, rows, batch_key):
+        """
+        Registers the file before its first batch and returns (first batch to write, changed).
+        changed is True when an earlier version of the file was (partly) ingested, its data
+        has to be removed before the new version goes in. An interrupted run of the same file
+        with the same batching resumes after its last committed batch.
+        """
+        signature = self.signature(file_path)
+        with self.lock:
+            entry = self.files.get(filename)
+            changed = entry is not None and entry.get('sha256') != signature['sha256']
+            resume = (entry is not None and not changed and
+                      not entry.get('complete') and entry.get('batch_key') == batch_key)
+
+            self.files[filename] = {
+                'file_date': file_date.strftime('%Y-%m-%d'),
+                **signature,
+                'rows': int(rows),
+                'batch_key': batch_key,
+                'batches_committed': entry['batches_committed'] if resume else 0,
+                'complete': False,
+                'ingested_at': None,
+            }
+            self.save()
+            return self.files[filename]['batches_committed'], changed
+
+    def commit_batch(self, filename, batch_index):
+        with self.lock:
+            self.files[filename]['batches_committed'] = batch_index + 1
+            self.save()
+
+    def complete_file(self, filename):
+        with self.lock:
+            self.files[filename]['complete'] = True
+            self.files[filename]['ingested_at'] = datetime.now().isoformat()
+            self.save()
+
+    def file_dates(self):
+        """{file date 'YYYY-MM-DD': sha256} of the completely ingested files."""
+        with self.lock:
+            return {entry['file_date']: entry['sha256'] for entry in self.files.values() if entry.get('complete')}
+
+    def save(self):
+        """Atomic write: temporary file in the same folder, fsync, rename over the manifest."""
+        folder = os.path.dirname(os.path.abspath(self.manifest_path))
+        os.makedirs(folder, exist_ok = True)
+        temporary_path = fr"{self.manifest_path}.{os.getpid()}.tmp"
+        with open(temporary_path, 'w') as f:
+            json.dump({'files': self.files}, f, indent = 1, sort_keys = True)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary_path, self.manifest_path)
@@ -2,7 +2,8 @@ import os
 import pandas as pd
 from pymongo import MongoClient, UpdateOne
 from datetime import datetime
-from mongo_pipeline.main import CSVtoMongoPipeline
+from mongo_pipeline.main import CSVtoMongoPipeline, CSVtoMongoBucketPipeline
+from parquet_pipeline.main import CSVtoParquetPipeline
 
 
 
@@ -10,9 +11,21 @@ def main():
     folder_path = "/Users/siddhanthmate/Desktop/AllFiles/CODE/WORK_CODE/fintech/DATA/BANKNIFTY"
     db_name = "MARKET_DATA"
     collection_name = "OPTIONS_DATA"
+    # set this to write the partitioned parquet layout instead of mongo
+    parquet_root_path = None
+    # set this to write N minute time buckets instead of one document per contract day
+    bucket_minutes = None
 
-    pipeline = CSVtoMongoPipeline(folder_path, db_name, collection_name)
-    pipeline.run()
+    if parquet_root_path:
+        pipeline = CSVtoParquetPipeline(folder_path, parquet_root_path)
+        pipeline.run()
+    else:
+        if bucket_minutes:
+            pipeline = CSVtoMongoBucketPipeline(folder_path, db_name, collection_name, bucket_minutes)
+        else:
+            pipeline = CSVtoMongoPipeline(folder_path, db_name, collection_name)
+        # files already ingested unchanged are skipped on the next run
+        pipeline.run_streaming(manifest_path = os.path.join(folder_path, "ingest_manifest.json"))
 
 
 
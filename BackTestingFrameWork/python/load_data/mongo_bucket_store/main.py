@@ -0,0 +1,171 @@
+import numpy as np
+import pandas as pd
+from pymongo import UpdateOne
+from mongo_db_loader.main import MongoDBHandler
+
+
+
+class MongoBucketHandler(MongoDBHandler):
+    """
+    Time bucketed schema: instead of one document per contract day with an unbounded data
+    array, a contract's bars are split into fixed bucket_minutes buckets, one document each:
+
+    {ticker, expiry, strike, instrument_name, file_date, bucket_start, min_time, max_time,
+     count, type, script, contract_monthly, contract_weekly,
+     columns: {datetime: [...], open: [...], high: [...], low: [...], close: [...],
+               volume: [...], oi: [...]}}
+
+    Documents stay small and bounded (at most bucket_minutes bars), the bars are stored as
+    one array per column so a read decodes straight into dataframe columns, and a time range
+    query is answered from the min_time/max_time index without unwinding arrays.
+    """
+    bucket_columns = ['Ticker', 'Expiry', 'Strike', 'bucket_start']
+
+    column_arrays = {
+        'datetime': 'datetime',
+        'Open': 'open',
+        'High': 'high',
+        'Low': 'low',
+        'Close': 'close',
+        'Volume': 'volume',
+        'OI': 'oi',
+    }
+
+    contract_fields = ['ticker', 'expiry', 'strike', 'type', 'script', 'contract_monthly', 'contract_weekly']
+
+    def __init__(self, db_name, collection_name, uri="mongodb://localhost:27017/", bucket_minutes = 30):
+        MongoDBHandler.__init__(self, db_name, collection_name, uri)
+        self.bucket_minutes = int(bucket_minutes)
+
+    def insert_data(self, df, file_date, instrument_name):
+        """Row by row updates do not fit fixed buckets, the bulk path is used."""
+        return self.insert_data_bulk(df, file_date, instrument_name)
+
+    def insert_data_bulk(self, df, file_date, instrument_name, batch_buckets = 1000, batch_rows = 200000,
+                         start_batch = 0, on_batch = None, replace_data = True):
+        """
+        Writes the file as time buckets with the same batching as MongoDBHandler.insert_data_bulk.
+        Every bucket document is set as a whole, so writing a bucket again (a replayed batch,
+        the same file ingested twice) replaces it instead of appending, replace_data is
+        accepted for the same signature and always on.
+        """
+        if df.empty:
+            return 0
+
+        df = df.assign(bucket_start = df['datetime'].dt.floor(fr"{self.bucket_minutes}min"))
+        df = df.sort_values(by = self.bucket_columns + ['datetime'], kind = 'stable').reset_index(drop = True)
+        starts, stops = self.bucket_bounds(df[self.bucket_columns])
+
+        arrays = {name: df[column].to_numpy() for column, name in self.column_arrays.items()}
+        arrays['datetime'] = np.array(df['datetime'].dt.to_pydatetime(), dtype = object)
+        # the last row of a bucket gives its contract fields, as with the row by row updates
+        bucket_frame = pd.DataFrame({
+            'ticker': df['Ticker'],
+            'expiry': df['Expiry'],
+            'strike': df['Strike'],
+            'type': df['Type'],
+            'script': df['Script'],
+            'contract_monthly': df['Contract_Monthly'],
+            'contract_weekly': df['Contract_Weekly'],
+            'bucket_start': df['bucket_start'],
+        }).iloc[[stop - 1 for stop in stops]]
+        bucket_records = bucket_frame.to_dict('records')
+
+        written = 0
+        for batch_index, first, last in self.bucket_batches(starts, stops, batch_buckets, batch_rows):
+            if batch_index < start_batch:
+                continue
+
+            operations = []
+            for bucket, start, stop in zip(bucket_records[first:last], starts[first:last], stops[first:last]):
+                columns = {name: values[start:stop].tolist() for name, values in arrays.items()}
+                operations.append(UpdateOne(
+                    {
+                        'ticker': bucket['ticker'],
+                        'expiry': bucket['expiry'],
+                        'strike': bucket['strike'],
+                        'instrument_name': instrument_name,
+                        'bucket_start': bucket['bucket_start'].to_pydatetime()
+                    },
+                    {
+                        '$set': {
+                            'file_date': file_date,
+                            'type': bucket['type'],
+                            'script': bucket['script'],
+                            'contract_monthly': bucket['contract_monthly'],
+                            'contract_weekly': bucket['contract_weekly'],
+                            'min_time': columns['datetime'][0],
+                            'max_time': columns['datetime'][-1],
+                            'count': int(stop - start),
+                            'columns': columns
+                        }
+                    },
+                    upsert=True
+                ))
+
+            self.collection.bulk_write(operations, ordered = False)
+            written += stops[last - 1] - starts[first]
+            if on_batch is not None:
+                on_batch(batch_index)
+
+        return written
+
+    def create_indexes(self):
+        """Indexes for range reads by contract and by time only."""
+        self.collection.create_index([("instrument_name", 1), ("ticker", 1), ("expiry", 1), ("strike", 1), ("bucket_start", 1)],
+                                     unique = True)
+        self.collection.create_index([("instrument_name", 1), ("expiry", 1), ("strike", 1), ("min_time", 1), ("max_time", 1)])
+        self.collection.create_index([("instrument_name", 1), ("min_time", 1), ("max_time", 1)])
+        print("Indexes created for fast retrieval.")
+
+    def bucket_query(self, start, end, instrument_name = "BANKNIFTY", expiry = None, strikes = None,
+                     strike_range = None, option_type = None, ticker = None):
+        """Mongo filter for the buckets overlapping [start, end] and the contract filters.
+        strikes is a list of strikes, strike_range a (low, high) window."""
+        query = {'instrument_name': instrument_name,
+                 'min_time': {'$lte': pd.Timestamp(end).to_pydatetime()},
+                 'max_time': {'$gte': pd.Timestamp(start).to_pydatetime()}}
+        if ticker is not None:
+            query['ticker'] = ticker
+        if expiry is not None:
+            query['expiry'] = {'$in': list(expiry)} if isinstance(expiry, (list, tuple, set)) else expiry
+        if strikes is not None:
+            query['strike'] = {'$in': [float(strike) for strike in strikes]}
+        elif strike_range is not None:
+            query['strike'] = {'$gte': float(strike_range[0]), '$lte': float(strike_range[1])}
+        if option_type is not None:
+            query['type'] = option_type
+        return query
+
+    def load_range(self, start, end, columns = None, batch_size = 1000, **filters):
+        """
+        Bars of [start, end] as one columnar dataframe, one row per bar with the contract fields
+        and the column arrays (all of them, or only the ones in columns). The arrays of every
+        bucket are concatenated per column, no per bar dict is built, and the edge buckets are
+        trimmed to the range at the end. filters are the bucket_query contract filters.
+        """
+        columns = list(self.column_arrays.values()) if columns is None else list(dict.fromkeys(['datetime'] + list(columns)))
+        projection = {'_id': 0, 'count': 1, **{field: 1 for field in self.contract_fields},
+                      **{fr"columns.{name}": 1 for name in columns}}
+
+        counts = []
+        contract_values = {field: [] for field in self.contract_fields}
+        column_values = {name: [] for name in columns}
+        cursor = self.collection.find(self.bucket_query(start, end, **filters), projection).sort(
+            [('ticker', 1), ('expiry', 1), ('strike', 1), ('bucket_start', 1)]).batch_size(batch_size)
+        for bucket in cursor:
+            counts.append(bucket['count'])
+            for field in self.contract_fields:
+                contract_values[field].append(bucket.get(field))
+            for name in columns:
+                column_values[name].extend(bucket['columns'][name])
+
+        counts = np.asarray(counts, dtype = np.int64)
+        df = pd.DataFrame({field: np.repeat(np.asarray(values, dtype = object), counts)
+                           for field, values in contract_values.items()})
+        for name in columns:
+            df[name] = pd.to_datetime(column_values[name]) if name == 'datetime' else column_values[name]
+        df = df.infer_objects()
+
+        mask = (df['datetime'] >= pd.Timestamp(start)) & (df['datetime'] <= pd.Timestamp(end))
+        return df[mask.to_numpy()].reset_index(drop = True)
@@ -1,9 +1,14 @@
 import os
+import queue
+import threading
 import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
 from pymongo import MongoClient, UpdateOne
 from datetime import datetime
-from csv_loader.main import CSVLoader
+from csv_loader.main import CSVLoader, parse_csv_file
+from ingest_manifest.main import IngestManifest
 from mongo_db_loader.main import MongoDBHandler
+from mongo_bucket_store.main import MongoBucketHandler
 
 
 
@@ -13,15 +18,118 @@ class CSVtoMongoPipeline(CSVLoader, MongoDBHandler):
         CSVLoader.__init__(self, folder_path)
         MongoDBHandler.__init__(self, db_name, collection_name)
 
-    def run(self, instrument_name = "BANKNIFTY"):
-        """Load CSV, process it, and store it into MongoDB."""
+    def run(self, instrument_name = "BANKNIFTY", bulk_insert = True):
+        """Load CSV, process it, and store it into MongoDB.
+        bulk_insert writes one update per bucket in bounded batches (insert_data_bulk), a file
+        which is already in the collection has its buckets deleted and written again so a
+        rerun does not duplicate them. Set it to False for the row by row insert_data."""
         
         dataframes = self.load_csv_files()
 
         for filename, file_date, df in dataframes:
             processed_df = self.process_dataframe(df)
-            self.insert_data(processed_df, 
-                             file_date, 
-                             instrument_name)  
+            if bulk_insert:
+                self.delete_file_data(file_date, instrument_name)
+                self.insert_data_bulk(processed_df,
+                                      file_date,
+                                      instrument_name,
+                                      replace_data = True)
+            else:
+                self.insert_data(processed_df, 
+                                 file_date, 
+                                 instrument_name)  
         
         self.create_indexes()
+
+    def run_streaming(self, instrument_name = "BANKNIFTY", max_workers = None, queue_size = 4,
+                      manifest_path = None, batch_buckets = 1000, batch_rows = 200000):
+        """Load CSV, process it, and store it into MongoDB with parsing and inserting overlapped.
+
+        The files come from a generator and are parsed in a process pool (pyarrow reader with
+        explicit dtypes), the parsed frames go through a bounded queue to a writer thread
+        which runs insert_data_bulk. At most max_workers files are being parsed and queue_size
+        are waiting for the writer, so memory does not grow with the number of files in the
+        folder: when the writer falls behind the parsing simply stops.
+
+        Every file replaces what an earlier ingest wrote for its date: its old buckets are
+        deleted and the buckets are written with replace_data, so running the ingest again
+        never duplicates the bars. With a manifest_path the run is also incremental and
+        resumable (see IngestManifest): files completed with the same contents are not even
+        parsed, and an interrupted file restarts after its last committed batch, which is
+        idempotent because of replace_data."""
+
+        max_workers = max_workers or os.cpu_count()
+        manifest = IngestManifest(manifest_path) if manifest_path else None
+        batch_key = fr"{batch_buckets}-{batch_rows}"
+        parsed = queue.Queue(maxsize = queue_size)
+        errors = []
+
+        def write_loop():
+            while True:
+                item = parsed.get()
+                if item is None:
+                    return
+                if errors:
+                    continue
+                filename, file_date, file_path, df = item
+                try:
+                    if manifest is None:
+                        self.delete_file_data(file_date, instrument_name)
+                        self.insert_data_bulk(df, file_date, instrument_name,
+                                              batch_buckets = batch_buckets,
+                                              batch_rows = batch_rows,
+                                              replace_data = True)
+                        continue
+
+                    start_batch, changed = manifest.start_file(filename, file_path, file_date, len(df), batch_key)
+                    if changed:
+                        self.delete_file_data(file_date, instrument_name)
+                    self.insert_data_bulk(df, file_date, instrument_name,
+                                          batch_buckets = batch_buckets,
+                                          batch_rows = batch_rows,
+                                          start_batch = start_batch,
+                                          on_batch = lambda batch_index: manifest.commit_batch(filename, batch_index),
+                                          replace_data = True)
+                    manifest.complete_file(filename)
+                except Exception as e:
+                    errors.append((filename, e))
+
+        writer = threading.Thread(target = write_loop, daemon = True)
+        writer.start()
+
+        files = ((filename, file_date, file_path) for filename, file_date, file_path in self.iter_csv_files()
+                 if manifest is None or not manifest.is_current(filename, file_path))
+        pending = {}
+        try:
+            with ProcessPoolExecutor(max_workers = max_workers) as executor:
+                while not errors:
+                    for filename, file_date, file_path in files:
+                        pending[executor.submit(parse_csv_file, file_path)] = (filename, file_date, file_path)
+                        if len(pending) >= max_workers:
+                            break
+                    if not pending:
+                        break
+
+                    done, _ = wait(pending, return_when = FIRST_COMPLETED)
+                    for future in done:
+                        filename, file_date, file_path = pending.pop(future)
+                        parsed.put((filename, file_date, file_path, future.result()))
+
+                for future in pending:
+                    future.cancel()
+        finally:
+            parsed.put(None)
+            writer.join()
+
+        if errors:
+            filename, e = errors[0]
+            raise RuntimeError(fr"Error inserting {filename} into MongoDB: {e}")
+
+        self.create_indexes()
+
+
+class CSVtoMongoBucketPipeline(CSVtoMongoPipeline, MongoBucketHandler):
+    """Same pipeline writing the time bucketed schema of MongoBucketHandler."""
+    def __init__(self, folder_path, db_name, collection_name, bucket_minutes = 30):
+        CSVLoader.__init__(self, folder_path)
+        MongoBucketHandler.__init__(self, db_name, collection_name, bucket_minutes = bucket_minutes)
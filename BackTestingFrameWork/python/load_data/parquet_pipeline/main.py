@@ -0,0 +1,64 @@
+import os
+import sys
+import pandas as pd
+from csv_loader.main import CSVLoader
+
+# Just pointing the path to the options dir so the layout is the one the backtests read
+options_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir, os.pardir, 'options'))
+
+sys.path.append(options_dir)
+
+from partitionedStore.main import PartitionedDataStore
+
+
+
+class CSVtoParquetPipeline(CSVLoader):
+    """
+    Writes the DD-MM-YYYY.csv folders into the partitioned parquet layout read by
+    options/partitionedStore: root_path/symbol=.../year=.../month=.../day=.../*.parquet.
+    The partition columns and schema are the ones of PartitionedDataStore, which does the
+    writing, and the files are read and written one at a time.
+    """
+    column_names = {
+        'Ticker': 'ticker',
+        'Expiry': 'expiry',
+        'Strike': 'strike_price',
+        'Contract_Monthly': 'contract_monthly',
+        'Contract_Weekly': 'contract_weekly',
+        'Open': 'open',
+        'High': 'high',
+        'Low': 'low',
+        'Close': 'close',
+        'Volume': 'volume',
+        'OI': 'oi',
+        'Type': 'option_type',
+        'Script': 'script',
+    }
+
+    def __init__(self, folder_path, root_path, compression = 'zstd'):
+        CSVLoader.__init__(self, folder_path)
+        self.root_path = root_path
+        self.compression = compression
+        self.store = PartitionedDataStore(root_path = root_path)
+
+    def to_store_frame(self, df):
+        """Rename the csv columns to the backtest names, the partition columns are added by the store."""
+        df = df.rename(columns = self.column_names)
+        if 'expiry' in df.columns:
+            df['expiry'] = pd.to_datetime(df['expiry'])
+        if 'option_type' in df.columns:
+            df['option_type'] = df['option_type'].replace({'CE': 'c', 'PE': 'p'})
+        return df
+
+    def write_partitions(self, df, instrument_name):
+        """Write one processed file, days already in the store are replaced."""
+        self.store.writeDataFrame(df = df,
+                                  symbol = instrument_name,
+                                  compression = self.compression)
+
+    def run(self, instrument_name = "BANKNIFTY"):
+        """Read, process and store the CSV files one at a time, only one file is held in memory."""
+        for filename, file_date, file_path in self.iter_csv_files():
+            processed_df = self.process_dataframe(self.read_csv_file(file_path))
+            self.write_partitions(self.to_store_frame(processed_df),
+                                  instrument_name)
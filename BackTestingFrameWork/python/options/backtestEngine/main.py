@@ -0,0 +1,125 @@
+import numpy as np
+import pandas as pd
+
+
+class BacktestEngine:
+    """
+    Array backed backtest engine for single position premium strategies. The legs of a
+    strategy are aligned once, the entry and exit rules are evaluated as boolean arrays over
+    the whole series and the position, entry premium, MTM and running max/min PnL are all
+    computed with array passes instead of walking the rows.
+
+    side is -1 for a short premium position (straddle/strangle sold) and 1 for a long one.
+    """
+    def __init__(self, side = -1):
+        if side not in (-1, 1):
+            raise ValueError("side has to be -1 (short) or 1 (long) in BacktestEngine")
+        self.side = side
+
+    """
+    Lines the legs up row by row the way zip over itertuples does: the legs are cut to the
+    shortest one and a row is only kept when every leg has the same value in match_columns
+    """
+    def alignLegs(self,
+                  legs = None,
+                  match_columns = ('datetime', 'spot', 'expiry')):
+        if not legs:
+            raise ValueError("No legs passed to alignLegs")
+
+        rows = min(len(leg) for leg in legs)
+        legs = [leg.iloc[:rows].reset_index(drop = True) for leg in legs]
+
+        matched = np.ones(rows, dtype = bool)
+        for column in match_columns:
+            first = legs[0][column].to_numpy()
+            for leg in legs[1:]:
+                matched &= (leg[column].to_numpy() == first)
+
+        return ([leg[matched].reset_index(drop = True) for leg in legs], matched)
+
+    """
+    Rules are either boolean arrays or callables which get the frame and return one
+    """
+    def evaluateRule(self, rule = None, frame = None):
+        if rule is None:
+            return np.zeros(len(frame), dtype = bool)
+        if callable(rule):
+            rule = rule(frame)
+        return np.asarray(rule, dtype = bool)
+
+    """
+    Vectorised version of the in_position state machine used by the objectives:
+    - a row inside the session with the entry signal opens the position if flat
+    - a row with the exit signal, or the session_end row, closes it if open
+    - rows outside the session (tradable False) leave the state untouched
+    The state after each row is the last event seen so far, which is a running maximum
+    over the row numbers of the events. Entry and exit signals are expected to be exclusive,
+    where both are set on a row the exit wins.
+    """
+    def positionState(self,
+                      entry_signal = None,
+                      exit_signal = None,
+                      session_end = None,
+                      tradable = None):
+        entry_signal = np.asarray(entry_signal, dtype = bool)
+        rows = len(entry_signal)
+        exit_signal = np.zeros(rows, dtype = bool) if exit_signal is None else np.asarray(exit_signal, dtype = bool)
+        session_end = np.zeros(rows, dtype = bool) if session_end is None else np.asarray(session_end, dtype = bool)
+        tradable = np.ones(rows, dtype = bool) if tradable is None else np.asarray(tradable, dtype = bool)
+
+        closes = tradable & (exit_signal | session_end)
+        opens = tradable & entry_signal & ~closes
+
+        row_numbers = np.arange(rows)
+        last_event = np.maximum.accumulate(np.where(opens | closes, row_numbers, -1))
+        in_position = (last_event >= 0) & opens[np.maximum(last_event, 0)]
+
+        was_in_position = np.concatenate(([False], in_position[:-1]))
+        entry = in_position & ~was_in_position
+        exit = ~in_position & was_in_position
+
+        return (in_position, entry, exit)
+
+    """
+    Runs the strategy over one aligned premium series and returns a dataframe with:
+    entry (side on the entry row), exit (1 on the exit row), net_position (side on the rows
+    held between entry and exit), entry_premium, mtm, pnl (realised on the exit row) and
+    the running max_pnl/min_pnl of the open trade.
+    """
+    def run(self,
+            frame = None,
+            premium_column = None,
+            entry_rule = None,
+            exit_rule = None,
+            session_end_rule = None,
+            tradable_rule = None):
+        if frame is None or premium_column is None:
+            raise ValueError("Empty parameters passed to BacktestEngine.run")
+
+        premium = frame[premium_column].to_numpy(dtype = np.float64)
+        in_position, entry, exit = self.positionState(entry_signal = self.evaluateRule(entry_rule, frame),
+                                                      exit_signal = self.evaluateRule(exit_rule, frame),
+                                                      session_end = self.evaluateRule(session_end_rule, frame),
+                                                      tradable = None if tradable_rule is None else self.evaluateRule(tradable_rule, frame))
+
+        rows = len(premium)
+        holding = in_position | exit
+        last_entry = np.maximum.accumulate(np.where(entry, np.arange(rows), -1))
+        entry_premium = np.where(holding & (last_entry >= 0), premium[np.maximum(last_entry, 0)], 0.0)
+
+        mtm = np.where(holding, -self.side*(entry_premium - premium), 0.0)
+        trade_id = np.cumsum(entry)
+        mtm_series = pd.Series(np.where(holding, mtm, np.nan))
+        max_pnl = mtm_series.groupby(trade_id).cummax().fillna(0.0).to_numpy()
+        min_pnl = mtm_series.groupby(trade_id).cummin().fillna(0.0).to_numpy()
+
+        return pd.DataFrame({
+            'entry': np.where(entry, self.side, 0),
+            'exit': exit.astype(np.int8),
+            'net_position': np.where(in_position & ~entry, self.side, 0),
+            'entry_premium': entry_premium,
+            'mtm': mtm,
+            'pnl': np.where(exit, mtm, 0.0),
+            'max_pnl': max_pnl,
+            'min_pnl': min_pnl,
+        }, index = frame.index)
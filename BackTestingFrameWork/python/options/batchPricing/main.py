@@ -0,0 +1,147 @@
+import numpy as np
+import pandas as pd
+from scipy.special import ndtr
+
+
+class BatchPricing:
+    def __init__(self) -> None:
+        pass
+
+    """
+    Converts scalars, lists, pandas series or numpy arrays into a numpy array of the
+    requested dtype so that every input can be broadcast against each other
+    """
+    def toArray(self,
+                values = None,
+                dtype = np.float64):
+        if values is None:
+            raise ValueError("Empty parameters passed to the toArray function")
+
+        if isinstance(values, (pd.Series, pd.Index)):
+            values = values.to_numpy()
+        return np.asarray(values, dtype = dtype)
+
+    """
+    Maps the option type column ('c'/'CE' or 'p'/'PE') to a boolean array which is
+    True for calls, anything else raises the same error as the scalar formula
+    """
+    def isCallArray(self,
+                    option_type = None):
+        if option_type is None:
+            raise ValueError("Invalid Option Type")
+
+        if isinstance(option_type, (pd.Series, pd.Index)):
+            option_type = option_type.to_numpy()
+        option_type = np.asarray(option_type).astype(str)
+
+        is_call = (option_type == 'c') | (option_type == 'CE')
+        is_put = (option_type == 'p') | (option_type == 'PE')
+
+        if not np.all(is_call | is_put):
+            raise ValueError("Invalid Option Type")
+        return is_call
+
+    """
+    Computes d1, d2 and the discount factor for whole arrays in one pass, these are
+    the shared intermediates for premiums and greeks so they are only computed once
+    """
+    def computeD1D2(self,
+                    strike_price = None,
+                    spot_price = None,
+                    time_to_maturity = None,
+                    rate_of_interest = 7/100,
+                    sigma = 0.2,
+                    dtype = np.float64):
+
+        strike_price = self.toArray(strike_price, dtype = dtype)
+        spot_price = self.toArray(spot_price, dtype = dtype)
+        time_to_maturity = self.toArray(time_to_maturity, dtype = dtype)
+        rate_of_interest = self.toArray(rate_of_interest, dtype = dtype)
+        sigma = self.toArray(sigma, dtype = dtype)
+
+        sqrt_time = np.sqrt(time_to_maturity)
+        sigma_sqrt_time = sigma*sqrt_time
+
+        d1 = (np.log(spot_price/strike_price) + (rate_of_interest + (sigma**2)/2)*time_to_maturity)/sigma_sqrt_time
+        d2 = d1 - sigma_sqrt_time
+        discount = np.exp(-rate_of_interest*time_to_maturity)
+
+        return (d1, d2, discount)
+
+    """
+    Vectorised version of calculateOptionPremium, prices every row of the chain in one
+    pass and returns the call and put premiums as numpy arrays. Pass dtype = np.float32
+    for memory bound runs over long histories.
+    """
+    def calculateOptionPremiums(self,
+                                strike_price = None,
+                                spot_price = None,
+                                time_to_maturity = None,
+                                rate_of_interest = 7/100,
+                                sigma = 0.2,
+                                dtype = np.float64):
+
+        if any(value is None for value in [strike_price, spot_price, time_to_maturity]):
+            raise ValueError("Empty parameters passed to the calculateOptionPremiums function")
+
+        d1, d2, discount = self.computeD1D2(strike_price = strike_price,
+                                            spot_price = spot_price,
+                                            time_to_maturity = time_to_maturity,
+                                            rate_of_interest = rate_of_interest,
+                                            sigma = sigma,
+                                            dtype = dtype)
+
+        strike_price = self.toArray(strike_price, dtype = dtype)
+        spot_price = self.toArray(spot_price, dtype = dtype)
+
+        discounted_strike = strike_price*discount
+        call_price = (spot_price*ndtr(d1)) - (discounted_strike*ndtr(d2))
+        put_price = (discounted_strike*ndtr(-d2)) - (spot_price*ndtr(-d1))
+
+        return (call_price, put_price)
+
+    """
+    Prices a whole chain and picks the call or put premium for each row using the
+    option type column, so a mixed chain dataframe can be priced in one call
+    """
+    def calculateChainPremiums(self,
+                               strike_price = None,
+                               spot_price = None,
+                               time_to_maturity = None,
+                               rate_of_interest = 7/100,
+                               sigma = 0.2,
+                               option_type = None,
+                               dtype = np.float64):
+
+        is_call = self.isCallArray(option_type = option_type)
+        call_price, put_price = self.calculateOptionPremiums(strike_price = strike_price,
+                                                             spot_price = spot_price,
+                                                             time_to_maturity = time_to_maturity,
+                                                             rate_of_interest = rate_of_interest,
+                                                             sigma = sigma,
+                                                             dtype = dtype)
+        return np.where(is_call, call_price, put_price)
+
+    """
+    Convenience wrapper for the backtest dataframes which already hold the
+    strike_price, spot, time_to_maturity and option_type columns
+    """
+    def priceOptionChain(self,
+                         df = None,
+                         rate_of_interest = 7/100,
+                         sigma = 0.2,
+                         dtype = np.float64):
+        if df is None or df.empty:
+            raise ValueError("Empty dataframe passed to the priceOptionChain function")
+
+        if isinstance(sigma, str):
+            sigma = df[sigma]
+
+        return pd.Series(self.calculateChainPremiums(strike_price = df['strike_price'],
+                                                     spot_price = df['spot'],
+                                                     time_to_maturity = df['time_to_maturity'],
+                                                     rate_of_interest = rate_of_interest,
+                                                     sigma = sigma,
+                                                     option_type = df['option_type'],
+                                                     dtype = dtype),
+                         index = df.index)
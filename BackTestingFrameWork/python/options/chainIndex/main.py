@@ -0,0 +1,121 @@
+import pandas as pd
+import numpy as np
+
+
+class OptionChainIndex:
+    """
+    Built once at load time, sorts the dataset by (day, expiry, option_type, strike_price, datetime)
+    so every leg of the chain is one contiguous block of rows. The start and stop row of each
+    block is kept in an offset table, so any leg's minute series is a slice of the sorted data
+    instead of a boolean mask over the full dataframe.
+    """
+    key_columns = ['expiry', 'option_type', 'strike_price']
+
+    def __init__(self, df = None, datetime_column = 'datetime'):
+        if df is None or df.empty:
+            raise ValueError("Empty dataframe passed to OptionChainIndex")
+
+        self.datetime_column = datetime_column
+
+        try:
+            sorted_df = self.sortedFrame(df = df, datetime_column = datetime_column)
+        except KeyError as e:
+            raise KeyError(fr"Column missing while building the chain index: {e}")
+
+        days = sorted_df[datetime_column].dt.normalize()
+        self.data = sorted_df
+
+        """
+        A new block starts wherever any of the key columns changes from the previous row
+        """
+        total_rows = len(sorted_df)
+        key_change = np.zeros(total_rows, dtype = bool)
+        key_change[0] = True
+        for values in [days.to_numpy()] + [sorted_df[column].to_numpy() for column in self.key_columns]:
+            key_change[1:] |= values[1:] != values[:-1]
+
+        starts = np.flatnonzero(key_change)
+        stops = np.append(starts[1:], total_rows)
+
+        block_keys = zip(days.iloc[starts].tolist(),
+                         *[sorted_df[column].iloc[starts].tolist() for column in self.key_columns])
+
+        self.offsets = {}
+        self.day_offsets = {}
+        self.expiries_by_day = {}
+        for key, start, stop in zip(block_keys, starts.tolist(), stops.tolist()):
+            self.offsets[key] = (start, stop)
+            day, expiry = key[0], key[1]
+            day_start, _ = self.day_offsets.get(day, (start, stop))
+            self.day_offsets[day] = (day_start, stop)
+            self.expiries_by_day.setdefault(day, set()).add(expiry)
+
+    """
+    Returns df in chain order. Data which is already sorted (e.g. the memory mapped copy
+    MemoryMappedDataset writes with this as its prepare_function) is recognised in one
+    linear pass and returned as it is without copying any column, anything else is
+    reordered once with lexsort on the key columns.
+    """
+    @classmethod
+    def sortedFrame(cls, df = None, datetime_column = 'datetime'):
+        sort_keys = [df[datetime_column].dt.normalize().to_numpy()]
+        for column in cls.key_columns + [datetime_column]:
+            values = df[column]
+            if values.dtype == object or pd.api.types.is_string_dtype(values):
+                values, _ = pd.factorize(values, sort = True)
+            sort_keys.append(np.asarray(values))
+
+        if cls.isSorted(sort_keys = sort_keys):
+            return df.reset_index(drop = True)
+        order = np.lexsort(sort_keys[::-1])
+        return df.take(order).reset_index(drop = True)
+
+    """
+    True when the rows are in lexicographic order of sort_keys (most significant first),
+    a row pair is decided by the first key where the two rows differ
+    """
+    @staticmethod
+    def isSorted(sort_keys = None):
+        decided = np.zeros(max(len(sort_keys[0]) - 1, 0), dtype = bool)
+        for values in sort_keys:
+            if np.any((values[1:] < values[:-1]) & ~decided):
+                return False
+            decided |= values[1:] > values[:-1]
+        return True
+
+    def normaliseDay(self, value = None):
+        return pd.Timestamp(value).normalize()
+
+    def days(self):
+        return list(self.day_offsets.keys())
+
+    def getDay(self, day = None):
+        start, stop = self.day_offsets.get(self.normaliseDay(day), (0, 0))
+        return self.data.iloc[start:stop]
+
+    def nearestExpiry(self, day = None):
+        expiries = self.expiries_by_day.get(self.normaliseDay(day))
+        if not expiries:
+            return None
+        return min(expiries)
+
+    """
+    Returns the minute series of one leg sorted by datetime, an empty frame if the leg
+    is not traded on that day
+    """
+    def getLeg(self,
+               day = None,
+               expiry = None,
+               option_type = None,
+               strike_price = None):
+        key = (self.normaliseDay(day), pd.Timestamp(expiry), option_type, strike_price)
+        start, stop = self.offsets.get(key, (0, 0))
+        return self.data.iloc[start:stop]
+
+    def getStraddleLegs(self,
+                        day = None,
+                        expiry = None,
+                        strike_price = None):
+        call_data = self.getLeg(day = day, expiry = expiry, option_type = 'c', strike_price = strike_price)
+        put_data = self.getLeg(day = day, expiry = expiry, option_type = 'p', strike_price = strike_price)
+        return (call_data, put_data)
@@ -0,0 +1,209 @@
+import hashlib
+import json
+import os
+import time
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.ipc as ipc
+
+
+class FileDataSource:
+    """
+    loadData over a single feather/arrow/parquet file with the PartitionedDataStore
+    arguments, the filters are evaluated by pyarrow while the file is scanned
+    """
+    formats = {'feather': 'feather', 'arrow': 'feather', 'parquet': 'parquet'}
+
+    def __init__(self, file_path = None):
+        if file_path is None:
+            raise ValueError("No file path provided for the FileDataSource")
+        extension = str(file_path).split('.')[-1].lower()
+        if extension not in self.formats:
+            raise ValueError(fr"Unsupported file format {extension}, has to be one of {tuple(self.formats)}")
+        self.file_path = str(file_path)
+        self.file_format = self.formats[extension]
+        self.name = self.file_path
+
+    def loadData(self,
+                 symbol = None,
+                 start_date = None,
+                 end_date = None,
+                 expiries = None,
+                 columns = None,
+                 filters = None):
+        dataset = ds.dataset(self.file_path, format = self.file_format)
+        expression = filters
+        conditions = []
+        if symbol is not None:
+            conditions.append(ds.field('symbol') == str(symbol))
+        if start_date is not None:
+            conditions.append(ds.field('datetime') >= pa.scalar(pd.Timestamp(start_date).normalize()))
+        if end_date is not None:
+            conditions.append(ds.field('datetime') < pa.scalar(pd.Timestamp(end_date).normalize() + pd.Timedelta(days = 1)))
+        if expiries is not None:
+            expiry_values = pa.array(pd.to_datetime(pd.Series(list(expiries)))).cast(dataset.schema.field('expiry').type)
+            conditions.append(ds.field('expiry').isin(expiry_values))
+        for condition in conditions:
+            expression = condition if expression is None else (expression & condition)
+
+        return dataset.to_table(columns = columns, filter = expression).to_pandas()
+
+
+class CachedDataSource:
+    """
+    Read through cache in front of any data source, an object with a loadData method and a
+    name describing what it reads (MongoDataSource, PartitionedDataStore, FileDataSource). A query (the loadData arguments and the source it
+    goes to) is hashed into a key and its result is kept as an uncompressed arrow file
+    cache_dir/<key>.arrow, so running the same days and expiries again in another session is
+    one memory mapped read instead of a database query.
+
+    - eviction: index.json keeps the size and last use of every entry, once the cache is
+      bigger than max_bytes the least recently used entries are deleted
+    - invalidation: a file source is part of the key through its size and mtime. With the
+      load_data ingest manifest (manifest_path) an entry also records the hash of every
+      ingested file date in its date range, and it is dropped when a date was re-ingested
+      with other contents or a new date was ingested inside the range.
+    """
+    index_name = 'index.json'
+
+    def __init__(self,
+                 source = None,
+                 cache_dir = None,
+                 max_bytes = 10*1024**3,
+                 manifest_path = None):
+        if source is None:
+            raise ValueError("No data source passed to the CachedDataSource")
+        if cache_dir is None:
+            raise ValueError("No cache directory provided for the CachedDataSource")
+
+        self.source = source
+        self.cache_dir = str(cache_dir)
+        self.max_bytes = int(max_bytes)
+        self.manifest_path = manifest_path
+        self.name = fr"{source.name} cached in {self.cache_dir}"
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(self.cache_dir, exist_ok = True)
+
+    """
+    What the source reads from, so the same query against another database, store or file
+    version gets another key
+    """
+    def sourceKey(self):
+        source = self.source
+        key = {'type': type(source).__name__}
+        collection = getattr(source, 'collection', None)
+        if collection is not None:
+            key['collection'] = fr"{getattr(getattr(collection, 'database', None), 'name', None)}.{getattr(collection, 'name', None)}"
+            key['schema'] = getattr(source, 'schema', None)
+        for attribute in ('root_path', 'file_path'):
+            path = getattr(source, attribute, None)
+            if path is not None:
+                key[attribute] = os.path.abspath(path)
+                if os.path.isfile(path):
+                    stat = os.stat(path)
+                    key['file_version'] = [stat.st_size, stat.st_mtime_ns]
+        return key
+
+    def queryKey(self, query = None):
+        canonical = json.dumps({'source': self.sourceKey(), 'query': query},
+                               sort_keys = True,
+                               default = str)
+        return hashlib.sha256(canonical.encode()).hexdigest()
+
+    """
+    {file date 'YYYY-MM-DD': sha256} of the completely ingested files inside the query's
+    date range, None without a manifest
+    """
+    def manifestDays(self, start_date = None, end_date = None):
+        if self.manifest_path is None or not os.path.exists(self.manifest_path):
+            return None
+        with open(self.manifest_path) as f:
+            files = json.load(f).get('files', {})
+
+        start = None if start_date is None else pd.Timestamp(start_date).strftime('%Y-%m-%d')
+        end = None if end_date is None else pd.Timestamp(end_date).strftime('%Y-%m-%d')
+        return {entry['file_date']: entry['sha256'] for entry in files.values()
+                if entry.get('complete') and (start is None or entry['file_date'] >= start)
+                and (end is None or entry['file_date'] <= end)}
+
+    def readIndex(self):
+        index_path = os.path.join(self.cache_dir, self.index_name)
+        if not os.path.exists(index_path):
+            return {}
+        try:
+            with open(index_path) as f:
+                return json.load(f)
+        except ValueError:
+            return {}
+
+    def writeIndex(self, index = None):
+        index_path = os.path.join(self.cache_dir, self.index_name)
+        temporary_path = fr"{index_path}.{os.getpid()}.tmp"
+        with open(temporary_path, 'w') as f:
+            json.dump(index, f)
+        os.replace(temporary_path, index_path)
+
+    def entryPath(self, key = None):
+        return os.path.join(self.cache_dir, fr"{key}.arrow")
+
+    def loadData(self, **query):
+        key = self.queryKey(query = query)
+        path = self.entryPath(key = key)
+        days = self.manifestDays(start_date = query.get('start_date'), end_date = query.get('end_date'))
+        index = self.readIndex()
+        entry = index.get(key)
+
+        if entry is not None and os.path.exists(path) and entry.get('days') == days:
+            with pa.memory_map(path, 'r') as source:
+                df = ipc.open_file(source).read_all().to_pandas()
+            entry['last_used'] = time.time()
+            self.writeIndex(index = index)
+            self.hits += 1
+            return df
+
+        df = self.source.loadData(**query)
+        self.misses += 1
+
+        temporary_path = fr"{path}.{os.getpid()}.tmp"
+        table = pa.Table.from_pandas(df, preserve_index = False)
+        with pa.OSFile(temporary_path, 'wb') as sink:
+            with ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(temporary_path, path)
+
+        index = self.readIndex()
+        index[key] = {'size': os.path.getsize(path),
+                      'last_used': time.time(),
+                      'days': days,
+                      'query': json.loads(json.dumps(query, default = str))}
+        self.evict(index = index, keep = key)
+        self.writeIndex(index = index)
+        return df
+
+    """
+    Deletes least recently used entries until the cache fits in max_bytes, the entry just
+    written is kept even if it is bigger than the whole budget
+    """
+    def evict(self, index = None, keep = None):
+        total = sum(entry['size'] for entry in index.values())
+        for key in sorted(index, key = lambda key: index[key]['last_used']):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            total -= index[key]['size']
+            del index[key]
+            try:
+                os.remove(self.entryPath(key = key))
+            except FileNotFoundError:
+                pass
+
+    def clear(self):
+        for key in self.readIndex():
+            try:
+                os.remove(self.entryPath(key = key))
+            except FileNotFoundError:
+                pass
+        self.writeIndex(index = {})
@@ -0,0 +1,110 @@
+import os
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from memoryMappedData.main import MemoryMappedDataset
+
+
+"""
+Every worker process maps the shared file once when it starts and keeps the table here,
+the day shards are zero copy slices of it
+"""
+_mapped_table = None
+
+
+def initialiseWorker(file_path = None, columns = None, worker_initializer = None):
+    global _mapped_table
+    with pa.memory_map(file_path, 'r') as source:
+        _mapped_table = pa.ipc.open_file(source).read_all()
+    if columns is not None:
+        _mapped_table = _mapped_table.select(list(columns))
+    if worker_initializer is not None:
+        worker_initializer(file_path)
+
+
+def runShard(strategy = None, day = None, start = None, stop = None, shard_frames = True):
+    day_df = None
+    if shard_frames:
+        day_df = _mapped_table.slice(start, stop - start).to_pandas(split_blocks = True)
+    return (day, strategy(day, day_df))
+
+
+class DayShardedExecutor:
+    """
+    Runs a strategy over every trading day in parallel. The trades are intraday so every
+    day is independent, each day becomes one task over a contiguous block of rows of the
+    memory mapped dataset:
+    - shared input: the workers map the same uncompressed arrow file so the data is held
+      once in the page cache and a task only carries (day, start row, stop row)
+    - load balancing: the tasks are queued largest day first and every idle worker pulls
+      the next one from the shared queue, so a few heavy expiry days never run last on a
+      single core while the rest of the pool waits
+    - ordered merge: the results come back in completion order and are put back in day
+      order before they are merged
+
+    Only strategies without state carried from one day to the next can be sharded, rolling
+    indicators or positions held over the close give other results on a single day.
+
+    strategy is a picklable callable (day, day_df) -> result, e.g. a module level function
+    or an instance of a module level class. State which is expensive to build (e.g. an
+    InterviewTest over the whole file) is built once per worker by worker_initializer
+    (called with the shared file path), such a strategy can run with shard_frames = False
+    and gets None instead of the day's dataframe.
+    """
+    def __init__(self,
+                 file_path = None,
+                 max_workers = None,
+                 columns = None,
+                 datetime_column = 'datetime',
+                 prepare_function = None):
+        self.dataset = MemoryMappedDataset(file_path = file_path,
+                                           prepare_function = prepare_function)
+        self.file_path = self.dataset.file_path
+        self.max_workers = max_workers or os.cpu_count()
+        self.columns = columns
+        self.datetime_column = datetime_column
+        self.shards = self.dayShards()
+
+    """
+    Returns (day, start row, stop row) for every day, only the datetime column is read.
+    The shared file has to be sorted by day (e.g. prepared with OptionChainIndex.sortedFrame)
+    so a day is one block of rows.
+    """
+    def dayShards(self):
+        days = self.dataset.readTable(columns = [self.datetime_column]).column(0).to_pandas().dt.normalize().to_numpy()
+        if len(days) == 0:
+            return []
+        if np.any(days[1:] < days[:-1]):
+            raise ValueError(fr"{self.file_path} is not sorted by day, write it with a prepare_function which sorts it")
+
+        starts = np.flatnonzero(np.concatenate(([True], days[1:] != days[:-1])))
+        stops = np.append(starts[1:], len(days))
+        return [(pd.Timestamp(days[start]), int(start), int(stop)) for start, stop in zip(starts, stops)]
+
+    """
+    Runs strategy over every day and returns the [(day, result)] list in day order, or
+    merge_function applied to it
+    """
+    def run(self,
+            strategy = None,
+            merge_function = None,
+            worker_initializer = None,
+            shard_frames = True):
+        if strategy is None:
+            raise ValueError("No strategy passed to DayShardedExecutor.run")
+
+        shards = sorted(self.shards, key = lambda shard: shard[2] - shard[1], reverse = True)
+        results = {}
+        with ProcessPoolExecutor(max_workers = self.max_workers,
+                                 initializer = initialiseWorker,
+                                 initargs = (self.file_path, self.columns, worker_initializer)) as executor:
+            futures = [executor.submit(runShard, strategy, day, start, stop, shard_frames) for day, start, stop in shards]
+            for future in as_completed(futures):
+                day, result = future.result()
+                results[day] = result
+
+        day_results = [(day, results[day]) for day, _, _ in self.shards]
+        if merge_function is not None:
+            return merge_function(day_results)
+        return day_results
@@ -0,0 +1,106 @@
+import math
+import numpy as np
+import pandas as pd
+from scipy.special import ndtr
+from batchPricing.main import BatchPricing
+
+
+class OptionGreeks(BatchPricing):
+    def __init__(self) -> None:
+        super().__init__()
+
+    """
+    Computes the premiums along with every first and second order greek for a whole
+    chain in one batched call. d1, d2, the normal pdf/cdf and the discount factor are
+    computed once and shared by every greek. Theta and rho are in the same time unit
+    as time_to_maturity, vega/vanna/volga are per unit of sigma.
+    """
+    def calculateGreeks(self,
+                        strike_price = None,
+                        spot_price = None,
+                        time_to_maturity = None,
+                        rate_of_interest = 7/100,
+                        sigma = 0.2,
+                        dtype = np.float64):
+
+        if any(value is None for value in [strike_price, spot_price, time_to_maturity]):
+            raise ValueError("Empty parameters passed to the calculateGreeks function")
+
+        d1, d2, discount = self.computeD1D2(strike_price = strike_price,
+                                            spot_price = spot_price,
+                                            time_to_maturity = time_to_maturity,
+                                            rate_of_interest = rate_of_interest,
+                                            sigma = sigma,
+                                            dtype = dtype)
+
+        strike_price = self.toArray(strike_price, dtype = dtype)
+        spot_price = self.toArray(spot_price, dtype = dtype)
+        time_to_maturity = self.toArray(time_to_maturity, dtype = dtype)
+        rate_of_interest = self.toArray(rate_of_interest, dtype = dtype)
+        sigma = self.toArray(sigma, dtype = dtype)
+
+        sqrt_time = np.sqrt(time_to_maturity)
+        sigma_sqrt_time = sigma*sqrt_time
+        pdf_d1 = np.exp(-(d1**2)/2)/math.sqrt(2*math.pi)
+        cdf_d1 = ndtr(d1)
+        cdf_d2 = ndtr(d2)
+        cdf_minus_d2 = 1 - cdf_d2
+        discounted_strike = strike_price*discount
+
+        call_price = (spot_price*cdf_d1) - (discounted_strike*cdf_d2)
+        put_price = call_price - spot_price + discounted_strike
+
+        gamma = pdf_d1/(spot_price*sigma_sqrt_time)
+        vega = spot_price*pdf_d1*sqrt_time
+        time_decay = -(spot_price*pdf_d1*sigma)/(2*sqrt_time)
+
+        return {
+            'call_price': call_price,
+            'put_price': put_price,
+            'call_delta': cdf_d1,
+            'put_delta': cdf_d1 - 1,
+            'gamma': gamma,
+            'vega': vega,
+            'call_theta': time_decay - (rate_of_interest*discounted_strike*cdf_d2),
+            'put_theta': time_decay + (rate_of_interest*discounted_strike*cdf_minus_d2),
+            'call_rho': discounted_strike*time_to_maturity*cdf_d2,
+            'put_rho': -discounted_strike*time_to_maturity*cdf_minus_d2,
+            'vanna': -pdf_d1*d2/sigma,
+            'volga': vega*d1*d2/sigma,
+            'charm': -pdf_d1*((2*rate_of_interest*time_to_maturity) - (d2*sigma_sqrt_time))/(2*time_to_maturity*sigma_sqrt_time),
+        }
+
+    """
+    Runs calculateGreeks over the backtest dataframe and picks the call or put value of
+    the type dependent greeks for each row, returns a dataframe aligned to the input
+    """
+    def greeksForChain(self,
+                       df = None,
+                       rate_of_interest = 7/100,
+                       sigma = 0.2,
+                       dtype = np.float64):
+        if df is None or df.empty:
+            raise ValueError("Empty dataframe passed to the greeksForChain function")
+
+        if isinstance(sigma, str):
+            sigma = df[sigma]
+
+        is_call = self.isCallArray(option_type = df['option_type'])
+        greeks = self.calculateGreeks(strike_price = df['strike_price'],
+                                      spot_price = df['spot'],
+                                      time_to_maturity = df['time_to_maturity'],
+                                      rate_of_interest = rate_of_interest,
+                                      sigma = sigma,
+                                      dtype = dtype)
+
+        return pd.DataFrame({
+            'premium': np.where(is_call, greeks['call_price'], greeks['put_price']),
+            'delta': np.where(is_call, greeks['call_delta'], greeks['put_delta']),
+            'gamma': greeks['gamma'],
+            'vega': greeks['vega'],
+            'theta': np.where(is_call, greeks['call_theta'], greeks['put_theta']),
+            'rho': np.where(is_call, greeks['call_rho'], greeks['put_rho']),
+            'vanna': greeks['vanna'],
+            'volga': greeks['volga'],
+            'charm': greeks['charm'],
+        }, index = df.index)
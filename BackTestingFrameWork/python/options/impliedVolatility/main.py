@@ -0,0 +1,149 @@
+import math
+import numpy as np
+import pandas as pd
+from scipy.special import ndtr
+from greeks.main import OptionGreeks
+
+
+class ImpliedVolatility(OptionGreeks):
+    def __init__(self) -> None:
+        super().__init__()
+
+    """
+    Inverts Black-Scholes for whole arrays of premiums. Every element runs Newton steps
+    on its own sigma and keeps a [low, high] bracket, whenever the Newton step leaves the
+    bracket (or vega is too small to trust) that element falls back to bisection.
+    Elements stop being iterated as soon as they converge.
+
+    An element has converged when its price is within tolerance of the premium relative to
+    the premium, plus the rounding a price near spot carries in dtype, or when its sigma
+    step is below tolerance relative to sigma (the vega scaled form of the same test). The
+    default tolerance follows dtype (1e-10 for float64, 1e-5 for float32), an absolute rupee
+    tolerance can not be met by float32 premiums in the thousands.
+
+    Returns (implied_volatility, converged), rows which did not converge or whose premium
+    is outside the no arbitrage bounds are NaN in implied_volatility and False in converged.
+    """
+    default_tolerances = {np.dtype(np.float64): 1e-10, np.dtype(np.float32): 1e-5}
+
+    def calculateImpliedVolatility(self,
+                                   premium = None,
+                                   strike_price = None,
+                                   spot_price = None,
+                                   time_to_maturity = None,
+                                   option_type = None,
+                                   rate_of_interest = 7/100,
+                                   initial_sigma = 0.2,
+                                   sigma_low = 1e-4,
+                                   sigma_high = 5.0,
+                                   tolerance = None,
+                                   max_iterations = 100,
+                                   dtype = np.float64):
+
+        if any(value is None for value in [premium, strike_price, spot_price, time_to_maturity, option_type]):
+            raise ValueError("Empty parameters passed to the calculateImpliedVolatility function")
+
+        premium = self.toArray(premium, dtype = dtype)
+        strike_price, spot_price, time_to_maturity, rate_of_interest = np.broadcast_arrays(
+            self.toArray(strike_price, dtype = dtype),
+            self.toArray(spot_price, dtype = dtype),
+            self.toArray(time_to_maturity, dtype = dtype),
+            self.toArray(rate_of_interest, dtype = dtype))
+        is_call = np.broadcast_to(self.isCallArray(option_type = option_type), premium.shape)
+
+        if tolerance is None:
+            tolerance = self.default_tolerances.get(np.dtype(dtype), 1e-10)
+        # a price is computed from spot sized terms, it can not be closer than their rounding
+        price_tolerance = tolerance*np.abs(premium) + 8*np.finfo(dtype).eps*spot_price
+
+        implied_volatility = np.full(premium.shape, np.nan, dtype = dtype)
+        converged = np.zeros(premium.shape, dtype = bool)
+
+        # no arbitrage bounds, anything outside these has no implied volatility
+        discounted_strike = strike_price*np.exp(-rate_of_interest*time_to_maturity)
+        lower_bound = np.where(is_call, np.maximum(spot_price - discounted_strike, 0), np.maximum(discounted_strike - spot_price, 0))
+        upper_bound = np.where(is_call, spot_price, discounted_strike)
+        valid = (np.isfinite(premium) & (time_to_maturity > 0) & (premium > lower_bound) & (premium < upper_bound))
+
+        active = np.flatnonzero(valid)
+        sigma = np.full(active.shape, initial_sigma, dtype = dtype)
+        low = np.full(active.shape, sigma_low, dtype = dtype)
+        high = np.full(active.shape, sigma_high, dtype = dtype)
+
+        for _ in range(int(max_iterations)):
+            if active.size == 0:
+                break
+
+            strike = strike_price[active]
+            spot = spot_price[active]
+            time = time_to_maturity[active]
+            rate = rate_of_interest[active]
+
+            d1, d2, discount = self.computeD1D2(strike_price = strike,
+                                                spot_price = spot,
+                                                time_to_maturity = time,
+                                                rate_of_interest = rate,
+                                                sigma = sigma,
+                                                dtype = dtype)
+            discounted = strike*discount
+            price = np.where(is_call[active],
+                             (spot*ndtr(d1)) - (discounted*ndtr(d2)),
+                             (discounted*ndtr(-d2)) - (spot*ndtr(-d1)))
+            price_error = price - premium[active]
+            vega = spot*np.exp(-(d1**2)/2)/math.sqrt(2*math.pi)*np.sqrt(time)
+
+            done = np.abs(price_error) <= price_tolerance[active]
+            implied_volatility[active[done]] = sigma[done]
+            converged[active[done]] = True
+
+            # price is increasing in sigma so the sign of the error tells which side to shrink
+            high = np.where(price_error > 0, sigma, high)
+            low = np.where(price_error < 0, sigma, low)
+
+            with np.errstate(divide = 'ignore', invalid = 'ignore'):
+                newton_sigma = sigma - price_error/vega
+            bisection_sigma = (low + high)/2
+            use_newton = np.isfinite(newton_sigma) & (newton_sigma > low) & (newton_sigma < high)
+            next_sigma = np.where(use_newton, newton_sigma, bisection_sigma)
+
+            # a step below tolerance relative to sigma can not move the price any further
+            settled = ~done & (np.abs(next_sigma - sigma) <= tolerance*sigma)
+            implied_volatility[active[settled]] = next_sigma[settled]
+            converged[active[settled]] = True
+            done |= settled
+            sigma = next_sigma
+
+            keep = ~done
+            active = active[keep]
+            sigma = sigma[keep]
+            low = low[keep]
+            high = high[keep]
+
+        return (implied_volatility, converged)
+
+    """
+    Adds the implied volatility for every row of the backtest dataframe using the close
+    premium. time_to_maturity in the dataset is in days so it is scaled to years with
+    days_in_year to match the annual rate of interest. Returns the dataframe with an iv
+    column and the rows which failed to converge.
+    """
+    def impliedVolatilityColumn(self,
+                                df = None,
+                                premium_column = 'close',
+                                rate_of_interest = 7/100,
+                                days_in_year = 365,
+                                output_column = 'iv',
+                                **kwargs):
+        if df is None or df.empty:
+            raise ValueError("Empty dataframe passed to the impliedVolatilityColumn function")
+
+        implied_volatility, converged = self.calculateImpliedVolatility(premium = df[premium_column],
+                                                                        strike_price = df['strike_price'],
+                                                                        spot_price = df['spot'],
+                                                                        time_to_maturity = df['time_to_maturity']/days_in_year,
+                                                                        option_type = df['option_type'],
+                                                                        rate_of_interest = rate_of_interest,
+                                                                        **kwargs)
+        df[output_column] = implied_volatility
+        failed_rows = df[~converged]
+        return (df, failed_rows)
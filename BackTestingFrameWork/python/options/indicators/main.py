@@ -0,0 +1,280 @@
+import math
+from abc import ABC, abstractmethod
+import numpy as np
+import pandas as pd
+
+
+class RingBuffer:
+    """
+    Fixed size window of the last size values, push() returns the value which falls out
+    of the window (NaN while the window is still filling up)
+    """
+    def __init__(self, size = None):
+        if size is None or int(size) < 1:
+            raise ValueError("RingBuffer size has to be at least 1")
+        self.size = int(size)
+        self.values = np.full(self.size, np.nan)
+        self.position = 0
+        self.count = 0
+
+    def push(self, value = None):
+        evicted = self.values[self.position]
+        self.values[self.position] = value
+        self.position = (self.position + 1) % self.size
+        self.count = min(self.count + 1, self.size)
+        return evicted
+
+    def reset(self):
+        self.values.fill(np.nan)
+        self.position = 0
+        self.count = 0
+
+
+class StreamingIndicator(ABC):
+    """
+    Every indicator has two modes which give the same numbers:
+    - batch(values): the whole series at once with vectorised pandas/numpy operations, used
+      by the backtests
+    - update(value): one new tick in constant time from the state kept in the indicator,
+      used on the live feed
+    warmup(values) runs batch over the history and leaves the state where the last value
+    left it, so a live indicator can start from history without replaying it tick by tick.
+    The four are abstract, an indicator missing one of them can not be created.
+    """
+    def __init__(self) -> None:
+        self.value = np.nan
+
+    @abstractmethod
+    def batch(self, values = None):
+        pass
+
+    @abstractmethod
+    def update(self, value = None):
+        pass
+
+    @abstractmethod
+    def reset(self):
+        pass
+
+    @abstractmethod
+    def warmup(self, values = None):
+        pass
+
+
+class SimpleMovingAverage(StreamingIndicator):
+    """
+    Same numbers as pandas rolling(window, min_periods).mean(): NaN values are skipped and
+    the mean is NaN until min_periods (default window) valid values are in the window.
+    The running sum is recomputed from the ring buffer once every window updates so the
+    add/subtract rounding error can not build up over a long live session.
+    """
+    def __init__(self, window = 30, min_periods = None):
+        super().__init__()
+        self.window = int(window)
+        self.min_periods = self.window if min_periods is None else int(min_periods)
+        self.ring = RingBuffer(size = self.window)
+        self.total = 0.0
+        self.observations = 0
+        self.updates = 0
+
+    def batch(self, values = None):
+        return pd.Series(values, dtype = np.float64).rolling(window = self.window,
+                                                             min_periods = self.min_periods).mean().to_numpy()
+
+    def update(self, value = None):
+        value = float(value)
+        evicted = self.ring.push(value)
+
+        if not math.isnan(value):
+            self.total += value
+            self.observations += 1
+        if not math.isnan(evicted):
+            self.total -= evicted
+            self.observations -= 1
+
+        self.updates += 1
+        if self.updates % self.window == 0:
+            self.total = float(np.nansum(self.ring.values))
+
+        self.value = self.total/self.observations if self.observations >= max(self.min_periods, 1) else np.nan
+        return self.value
+
+    def reset(self):
+        self.ring.reset()
+        self.total = 0.0
+        self.observations = 0
+        self.updates = 0
+        self.value = np.nan
+
+    def warmup(self, values = None):
+        values = np.asarray(values, dtype = np.float64)
+        result = self.batch(values)
+        self.reset()
+        for value in values[-self.window:]:
+            self.ring.push(value)
+        self.total = float(np.nansum(self.ring.values))
+        self.observations = int(np.count_nonzero(~np.isnan(self.ring.values)))
+        self.updates = 0
+        self.value = result[-1] if len(result) else np.nan
+        return result
+
+
+class ExponentialMovingAverage(StreamingIndicator):
+    """
+    Recursive EMA, same numbers as pandas ewm(alpha, adjust = False).mean():
+    ema = alpha*value + (1 - alpha)*previous ema, seeded with the first value. A NaN tick
+    keeps the last value but still decays its weight, the way pandas handles gaps.
+    Either span (alpha = 2/(span + 1)) or alpha has to be given.
+    """
+    def __init__(self, span = None, alpha = None):
+        super().__init__()
+        if alpha is None:
+            if span is None:
+                raise ValueError("Either span or alpha has to be passed to ExponentialMovingAverage")
+            alpha = 2/(float(span) + 1)
+        if not 0 < alpha <= 1:
+            raise ValueError("alpha has to be in (0, 1] in ExponentialMovingAverage")
+        self.alpha = float(alpha)
+        self.old_weight = 1.0
+
+    def batch(self, values = None):
+        return pd.Series(values, dtype = np.float64).ewm(alpha = self.alpha,
+                                                         adjust = False).mean().to_numpy()
+
+    def update(self, value = None):
+        value = float(value)
+        if math.isnan(self.value):
+            self.value = value
+            self.old_weight = 1.0
+        else:
+            self.old_weight *= (1 - self.alpha)
+            if not math.isnan(value):
+                self.value = ((self.old_weight*self.value) + (self.alpha*value))/(self.old_weight + self.alpha)
+                self.old_weight = 1.0
+        return self.value
+
+    def reset(self):
+        self.value = np.nan
+        self.old_weight = 1.0
+
+    def warmup(self, values = None):
+        values = np.asarray(values, dtype = np.float64)
+        result = self.batch(values)
+        self.value = result[-1] if len(result) else np.nan
+        """
+        Trailing NaN ticks have already decayed the weight of the last value
+        """
+        trailing_gaps = len(values) - 1 - np.flatnonzero(~np.isnan(values))[-1] if np.any(~np.isnan(values)) else 0
+        self.old_weight = (1 - self.alpha)**trailing_gaps
+        return result
+
+
+class RelativeStrengthIndex(StreamingIndicator):
+    """
+    RSI with simple moving averages of the gains and losses over window ticks, the logic
+    of BaseFormulas.calculate_rsi: the first tick has no change and counts as a gain and a
+    loss of 0, the averages start from the first tick (min_periods = 1), the RSI is 100 when
+    there are only gains in the window and NaN when the price did not move at all
+    """
+    def __init__(self, window = 30):
+        super().__init__()
+        self.window = int(window)
+        self.average_gain = SimpleMovingAverage(window = self.window, min_periods = 1)
+        self.average_loss = SimpleMovingAverage(window = self.window, min_periods = 1)
+        self.previous = np.nan
+
+    def batch(self, values = None):
+        values = pd.Series(values, dtype = np.float64)
+        delta = values.diff()
+        gain = (delta.where(delta > 0, 0)).fillna(0)
+        loss = (-delta.where(delta < 0, 0)).fillna(0)
+
+        avg_gain = gain.rolling(window = self.window, min_periods = 1).mean()
+        avg_loss = loss.rolling(window = self.window, min_periods = 1).mean()
+
+        rs = avg_gain / avg_loss
+        return (100 - (100 / (1 + rs))).to_numpy()
+
+    def rsiFromAverages(self, avg_gain = None, avg_loss = None):
+        if avg_loss == 0:
+            return np.nan if avg_gain == 0 else 100.0
+        return 100 - (100 / (1 + avg_gain/avg_loss))
+
+    def update(self, value = None):
+        value = float(value)
+        delta = value - self.previous
+        self.previous = value
+
+        gain = delta if delta > 0 else 0.0
+        loss = -delta if delta < 0 else 0.0
+        self.value = self.rsiFromAverages(avg_gain = self.average_gain.update(gain),
+                                          avg_loss = self.average_loss.update(loss))
+        return self.value
+
+    def reset(self):
+        self.average_gain.reset()
+        self.average_loss.reset()
+        self.previous = np.nan
+        self.value = np.nan
+
+    def warmup(self, values = None):
+        values = np.asarray(values, dtype = np.float64)
+        delta = np.diff(values, prepend = np.nan)
+        self.average_gain.warmup(np.where(delta > 0, delta, 0.0))
+        self.average_loss.warmup(np.where(delta < 0, -delta, 0.0))
+        self.previous = values[-1] if len(values) else np.nan
+
+        result = self.batch(values)
+        self.value = result[-1] if len(result) else np.nan
+        return result
+
+
+class AverageTrueRange(StreamingIndicator):
+    """
+    ATR with Wilder smoothing (alpha = 1/window) of the true range
+    max(high - low, |high - previous close|, |low - previous close|), the first tick has no
+    previous close so its true range is high - low. On a close only feed high, low and
+    close are the same tick and the true range is the absolute change of the price.
+    """
+    def __init__(self, window = 14):
+        super().__init__()
+        self.window = int(window)
+        self.smoothing = ExponentialMovingAverage(alpha = 1/self.window)
+        self.previous_close = np.nan
+
+    def trueRange(self, high = None, low = None, close = None):
+        high = np.asarray(high, dtype = np.float64)
+        low = np.asarray(low, dtype = np.float64)
+        previous_close = np.concatenate(([np.nan], np.asarray(close, dtype = np.float64)[:-1]))
+        return np.fmax(high - low, np.fmax(np.abs(high - previous_close), np.abs(low - previous_close)))
+
+    def batch(self, high = None, low = None, close = None):
+        low = high if low is None else low
+        close = high if close is None else close
+        return self.smoothing.batch(self.trueRange(high = high, low = low, close = close))
+
+    def update(self, high = None, low = None, close = None):
+        high = float(high)
+        low = high if low is None else float(low)
+        close = high if close is None else float(close)
+
+        true_range = high - low
+        if not math.isnan(self.previous_close):
+            true_range = max(true_range, abs(high - self.previous_close), abs(low - self.previous_close))
+        self.previous_close = close
+
+        self.value = self.smoothing.update(true_range)
+        return self.value
+
+    def reset(self):
+        self.smoothing.reset()
+        self.previous_close = np.nan
+        self.value = np.nan
+
+    def warmup(self, high = None, low = None, close = None):
+        low = high if low is None else low
+        close = high if close is None else close
+        result = self.smoothing.warmup(self.trueRange(high = high, low = low, close = close))
+        self.previous_close = float(np.asarray(close, dtype = np.float64)[-1]) if len(result) else np.nan
+        self.value = self.smoothing.value
+        return result
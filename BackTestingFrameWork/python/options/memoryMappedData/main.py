@@ -0,0 +1,81 @@
+import os
+import pyarrow as pa
+import pyarrow.feather as feather
+
+
+class MemoryMappedDataset:
+    """
+    Loads the backtest dataset from an uncompressed Arrow IPC file through a memory map.
+    Feather files are usually lz4/zstd compressed which forces every process to decompress
+    its own copy, so an uncompressed sibling file (<name>.mmap.arrow) is written once and
+    every process maps that instead. The pages are shared through the OS page cache and
+    only the columns which are converted to pandas get touched.
+
+    prepare_function (dataframe -> dataframe) is applied once before the copy is written,
+    e.g. to store the rows already in the order the backtest sorts them into. Its name is
+    kept in the file metadata, a copy prepared by another function is written again.
+    """
+    shared_suffix = '.mmap.arrow'
+    prepared_key = b'prepared_by'
+
+    def __init__(self, file_path = None, prepare_function = None):
+        if file_path is None:
+            raise ValueError("No file path provided for the MemoryMappedDataset")
+
+        if not os.path.exists(str(file_path)):
+            raise FileNotFoundError("File does not exist")
+
+        self.source_path = str(file_path)
+        self.file_path = self.sharedCopy(self.source_path, prepare_function = prepare_function)
+
+    """
+    Returns the path of the uncompressed copy of source_path, writing it if it does not
+    exist or is older than the source. The copy is written to a temporary file and then
+    renamed so several workers starting together never read a half written file.
+    """
+    def sharedCopy(self, source_path = None, prepare_function = None):
+        if source_path.endswith(self.shared_suffix):
+            return source_path
+
+        shared_path = os.path.splitext(source_path)[0] + self.shared_suffix
+        prepared_by = self.preparedBy(prepare_function)
+        if (os.path.exists(shared_path) and os.path.getmtime(shared_path) >= os.path.getmtime(source_path)
+                and self.readPreparedBy(shared_path) == prepared_by):
+            return shared_path
+
+        table = feather.read_table(source_path)
+        if prepare_function is not None:
+            table = pa.Table.from_pandas(prepare_function(table.to_pandas()), preserve_index = False)
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), self.prepared_key: prepared_by})
+        temporary_path = fr"{shared_path}.{os.getpid()}.tmp"
+        feather.write_feather(table, temporary_path, compression = 'uncompressed')
+        os.replace(temporary_path, shared_path)
+        return shared_path
+
+    @staticmethod
+    def preparedBy(prepare_function = None):
+        if prepare_function is None:
+            return b''
+        return fr"{prepare_function.__module__}.{prepare_function.__qualname__}".encode()
+
+    def readPreparedBy(self, shared_path = None):
+        try:
+            with pa.memory_map(shared_path, 'r') as source:
+                metadata = pa.ipc.open_file(source).schema.metadata or {}
+        except (pa.ArrowInvalid, OSError):
+            return None
+        return metadata.get(self.prepared_key, b'')
+
+    def readTable(self, columns = None):
+        with pa.memory_map(self.file_path, 'r') as source:
+            table = pa.ipc.open_file(source).read_all()
+        if columns is not None:
+            table = table.select(list(columns))
+        return table
+
+    """
+    split_blocks keeps one block per column so numeric columns without nulls point
+    straight at the mapped pages instead of being copied into a consolidated block
+    """
+    def toDataFrame(self, columns = None):
+        return self.readTable(columns = columns).to_pandas(split_blocks = True)
@@ -0,0 +1,201 @@
+import numpy as np
+import pandas as pd
+from pymongo import MongoClient
+
+
+class MongoDataSource:
+    """
+    Reads the options minute data written by load_data straight from MongoDB into the
+    backtest frame (datetime, date, expiry, symbol, option_type, strike_price, close, spot,
+    ...), so InterviewTest and ReadData can run against the shared database without a
+    feather export. Works on both load_data schemas:
+    - 'contract_day': one document per contract and file date with a data array of bars
+      (MongoDBHandler)
+    - 'bucket': fixed time buckets with one array per column (MongoBucketHandler)
+
+    The filters on the file date / bucket times, expiry and strike are done by the server
+    and a $project turns every document into one array per requested field, so the cursor
+    batches hold a few lists per contract instead of a dict per bar. The lists are
+    concatenated into numpy arrays once at the end.
+
+    The csv data has no underlying price, spot is taken from spot_data (a frame with
+    datetime and spot columns) when it is passed, otherwise it is implied from put call
+    parity on the nearest expiry: K + C - P at the strike where the call and put are
+    closest, every minute.
+    """
+    schemas = ('contract_day', 'bucket')
+
+    bar_fields = ['datetime', 'open', 'high', 'low', 'close', 'volume', 'oi']
+
+    def __init__(self,
+                 db_name = "MARKET_DATA",
+                 collection_name = "OPTIONS_DATA",
+                 uri = "mongodb://localhost:27017/",
+                 schema = 'contract_day',
+                 expiry_format = '%Y-%m-%d',
+                 batch_size = 1000,
+                 spot_data = None,
+                 collection = None):
+        if schema not in self.schemas:
+            raise ValueError(fr"Unknown schema {schema}, has to be one of {self.schemas}")
+
+        self.schema = schema
+        self.expiry_format = expiry_format
+        self.batch_size = int(batch_size)
+        self.spot_data = spot_data
+        if collection is None:
+            self.client = MongoClient(uri)
+            collection = self.client[db_name][collection_name]
+        self.collection = collection
+        # what the data was read from, shown by ReadData and InterviewTest
+        self.name = fr"mongodb {getattr(getattr(collection, 'database', None), 'name', db_name)}.{getattr(collection, 'name', collection_name)} ({schema})"
+
+    """
+    $match on the instrument, days, expiries and strike window. The contract day documents
+    are matched on their file_date, the buckets on their min_time/max_time.
+    """
+    def matchStage(self,
+                   symbol = None,
+                   start_date = None,
+                   end_date = None,
+                   expiries = None,
+                   strikes = None,
+                   strike_range = None):
+        match = {}
+        if symbol is not None:
+            match['instrument_name'] = str(symbol)
+
+        start = None if start_date is None else pd.Timestamp(start_date).normalize()
+        end = None if end_date is None else pd.Timestamp(end_date).normalize() + pd.Timedelta(days = 1)
+        if self.schema == 'contract_day':
+            date_range = {}
+            if start is not None:
+                date_range['$gte'] = start.to_pydatetime()
+            if end is not None:
+                date_range['$lt'] = end.to_pydatetime()
+            if date_range:
+                match['file_date'] = date_range
+        else:
+            if start is not None:
+                match['max_time'] = {'$gte': start.to_pydatetime()}
+            if end is not None:
+                match['min_time'] = {'$lt': end.to_pydatetime()}
+
+        if expiries is not None:
+            match['expiry'] = {'$in': [pd.Timestamp(expiry).strftime(self.expiry_format) for expiry in expiries]}
+        if strikes is not None:
+            match['strike'] = {'$in': [float(strike) for strike in strikes]}
+        elif strike_range is not None:
+            match['strike'] = {'$gte': float(strike_range[0]), '$lte': float(strike_range[1])}
+        return match
+
+    """
+    One array per bar field for every document, plus the contract fields
+    """
+    def projectStage(self, fields = None):
+        prefix = 'data' if self.schema == 'contract_day' else 'columns'
+        project = {'_id': 0, 'ticker': 1, 'expiry': 1, 'strike': 1, 'instrument_name': 1,
+                   'type': '$data.type' if self.schema == 'contract_day' else 1}
+        project.update({field: fr"${prefix}.{field}" for field in fields})
+        return project
+
+    """
+    Same arguments as PartitionedDataStore.loadData (filters are extra $match conditions)
+    plus the strike window, strikes is a list of strikes and strike_range a (low, high)
+    window. columns are the columns of the returned frame, the contract columns are
+    always there.
+    """
+    def loadData(self,
+                 symbol = None,
+                 start_date = None,
+                 end_date = None,
+                 expiries = None,
+                 columns = None,
+                 filters = None,
+                 strikes = None,
+                 strike_range = None):
+        fields = [field for field in self.bar_fields if columns is None or field in columns or field == 'datetime']
+        if 'close' not in fields and (columns is None or 'spot' in columns):
+            fields.append('close')
+
+        match = self.matchStage(symbol = symbol,
+                                start_date = start_date,
+                                end_date = end_date,
+                                expiries = expiries,
+                                strikes = strikes,
+                                strike_range = strike_range)
+        if filters is not None:
+            match.update(filters)
+
+        counts = []
+        contracts = {name: [] for name in ['ticker', 'expiry', 'strike', 'instrument_name', 'type']}
+        arrays = {field: [] for field in fields}
+        cursor = self.collection.aggregate([{'$match': match}, {'$project': self.projectStage(fields = fields)}],
+                                           batchSize = self.batch_size)
+        for document in cursor:
+            bars = document['datetime']
+            counts.append(len(bars))
+            for name in contracts:
+                value = document.get(name)
+                contracts[name].append(value[0] if isinstance(value, list) and value else value)
+            for field in fields:
+                arrays[field].append(bars if field == 'datetime' else document[field])
+
+        if not counts:
+            raise ValueError(fr"No documents in {self.collection.name} for {match}")
+
+        counts = np.asarray(counts, dtype = np.int64)
+        df = pd.DataFrame({'datetime': pd.to_datetime(np.concatenate(arrays['datetime']))})
+        df['date'] = df['datetime']
+        df['expiry'] = pd.to_datetime(np.repeat(np.asarray(contracts['expiry'], dtype = object), counts),
+                                      format = self.expiry_format)
+        df['symbol'] = np.repeat(np.asarray(contracts['instrument_name'], dtype = object), counts)
+        df['ticker'] = np.repeat(np.asarray(contracts['ticker'], dtype = object), counts)
+        df['option_type'] = pd.Series(np.repeat(np.asarray(contracts['type'], dtype = object), counts)).replace({'CE': 'c', 'PE': 'p'}).to_numpy()
+        strike_price = np.repeat(np.asarray(contracts['strike'], dtype = np.float64), counts)
+        df['strike_price'] = strike_price.astype(np.int64) if np.all(strike_price == np.round(strike_price)) else strike_price
+        for field in fields[1:]:
+            df[field] = np.concatenate(arrays[field]).astype(np.int64 if field in ('volume', 'oi') else np.float64)
+
+        if start_date is not None or end_date is not None:
+            days = df['datetime'].dt.normalize()
+            keep = np.ones(len(df), dtype = bool)
+            if start_date is not None:
+                keep &= (days >= pd.Timestamp(start_date).normalize()).to_numpy()
+            if end_date is not None:
+                keep &= (days <= pd.Timestamp(end_date).normalize()).to_numpy()
+            df = df[keep]
+
+        if columns is None or 'spot' in columns:
+            df['spot'] = self.spot(df)
+        if columns is not None:
+            df = df[[column for column in df.columns
+                     if column in columns or column in ('datetime', 'date', 'expiry', 'symbol', 'option_type', 'strike_price')]]
+        return df.reset_index(drop = True)
+
+    def spot(self, df = None):
+        if self.spot_data is None:
+            return self.impliedSpot(df)
+        spot = self.spot_data.drop_duplicates(subset = 'datetime').set_index('datetime')['spot']
+        return df['datetime'].map(spot).to_numpy(dtype = np.float64)
+
+    """
+    Put call parity spot for every row's minute: on the nearest expiry trading at that
+    minute, K + C - P at the strike with the smallest |C - P|. Rates and dividends are
+    ignored, over an intraday expiry week the carry is a few points.
+    """
+    def impliedSpot(self, df = None):
+        legs = df[['datetime', 'expiry', 'strike_price', 'option_type', 'close']]
+        pairs = legs.pivot_table(index = ['datetime', 'expiry', 'strike_price'],
+                                 columns = 'option_type',
+                                 values = 'close',
+                                 aggfunc = 'last')
+        if not {'c', 'p'}.issubset(pairs.columns):
+            raise ValueError("Calls and puts are both needed to imply the spot, pass spot_data")
+
+        pairs = pairs.dropna(subset = ['c', 'p']).reset_index()
+        pairs['gap'] = (pairs['c'] - pairs['p']).abs()
+        pairs = pairs.sort_values(by = ['datetime', 'expiry', 'gap'], kind = 'stable').drop_duplicates(subset = 'datetime')
+        spot = pd.Series((pairs['strike_price'] + pairs['c'] - pairs['p']).to_numpy(dtype = np.float64),
+                         index = pairs['datetime'])
+        return df['datetime'].map(spot).to_numpy(dtype = np.float64)
@@ -2,12 +2,14 @@ import numpy as np
 from scipy.stats import norm 
 import pandas as pd
 from timeFuncs.main import OptionsTimeFunctions
+from greeks.main import OptionGreeks
+from strikeGrid.main import StrikeGrid
 from datetime import datetime
 
 
-class OptionsFormulaBook(OptionsTimeFunctions):
+class OptionsFormulaBook(OptionsTimeFunctions, OptionGreeks):
     def __init__(self):
-        super.__init__()
+        super().__init__()
 
     def calculateOptionPremium(self,
                 strike_price = None, 
@@ -38,13 +40,20 @@ class OptionsFormulaBook(OptionsTimeFunctions):
                       put_price = None):
         return call_price + put_price
     
+    """
+    Both take a single spot/price or an array of them, the strikes are resolved with
+    searchsorted on the sorted strikes instead of a min() over the list per spot
+    """
     def nearestAtmStrike(self, spot_price = None, strike_prices = None):
-        return min(strike_prices, key = lambda x: abs(x-spot_price))
+        ladder = np.unique(np.asarray(strike_prices))
+        strikes = ladder[StrikeGrid.nearestIndex(ladder = ladder, prices = spot_price)]
+        return strikes.item() if np.ndim(strikes) == 0 else strikes
     
     def closestStrike(self, 
                       price = None, 
                       interval = 100):
-        return int(round(price/interval)*interval)
+        strikes = (np.round(np.asarray(price, dtype = np.float64)/interval)*interval).astype(np.int64)
+        return int(strikes) if strikes.ndim == 0 else strikes
         
 
     
@@ -0,0 +1,233 @@
+import itertools
+import numpy as np
+import pandas as pd
+from backtestEngine.main import BacktestEngine
+from chainIndex.main import OptionChainIndex
+from dayShardedExecutor.main import DayShardedExecutor
+from indicators.main import SimpleMovingAverage
+from preprocessing.main import DatasetPreprocessor
+from strangle.main import Strangle
+
+
+class SweepDayEvaluator(Strangle, DatasetPreprocessor):
+    """
+    Evaluates every parameter combination on one day shard. The day is indexed once and
+    every call + put pair (the summed premium on the minutes both legs trade) is cached
+    the first time a combination asks for it, so combinations which land on the same
+    strikes reuse the same series. The strategies are the ones of the objectives:
+    - straddle: sell the ATM straddle at start_trade_time, buy it back at end_trade_time
+    - strangle: same with the strikes interval away from ATM (getStranglePrices)
+    - strangle_dma: objective four, the strikes are straddle_multiplier x the ATM straddle
+      premium away from spot, the strangle is sold when its premium is below the
+      window_period DMA and bought back when it is above it
+    The position is always closed at end_trade_time (or the last minute before it).
+    """
+    strategies = ('straddle', 'strangle', 'strangle_dma')
+    columns = ['datetime', 'expiry', 'option_type', 'strike_price', 'close', 'spot']
+
+    def __init__(self,
+                 strategy = 'straddle',
+                 combinations = None,
+                 strike_interval = None):
+        if strategy not in self.strategies:
+            raise ValueError(fr"Unknown strategy {strategy}, has to be one of {self.strategies}")
+        self.strategy = strategy
+        self.combinations = combinations or []
+        self.strike_interval = strike_interval
+        self.engine = BacktestEngine(side = -1)
+
+    def pairedPremium(self,
+                      pairs = None,
+                      chain_index = None,
+                      day = None,
+                      expiry = None,
+                      call_strike = None,
+                      put_strike = None):
+        key = (call_strike, put_strike)
+        if key not in pairs:
+            call_data = chain_index.getLeg(day, expiry, 'c', call_strike)
+            put_data = chain_index.getLeg(day, expiry, 'p', put_strike)
+            time_of_day, call_rows, put_rows = np.intersect1d(self.timeOfDayValues(call_data),
+                                                          self.timeOfDayValues(put_data),
+                                                          assume_unique = True,
+                                                          return_indices = True)
+            premium = (call_data['close'].to_numpy(dtype = np.float64)[call_rows] +
+                       put_data['close'].to_numpy(dtype = np.float64)[put_rows])
+            pairs[key] = (time_of_day, premium)
+        return pairs[key]
+
+    """
+    Runs one combination on the day, returns None when the legs it needs are not traded
+    """
+    def evaluate(self,
+                 pairs = None,
+                 chain_index = None,
+                 day = None,
+                 expiry = None,
+                 spot_at = None,
+                 parameters = None,
+                 strike_interval = 100):
+        start = self.timeToNanoseconds(str(parameters['start_trade_time']))
+        end = self.timeToNanoseconds(str(parameters['end_trade_time']))
+        spot = spot_at.get(start)
+        if spot is None:
+            return None
+
+        atm_strike = int(self.nearestAtm(spot, interval = strike_interval))
+        leg = dict(pairs = pairs, chain_index = chain_index, day = day, expiry = expiry)
+
+        if self.strategy == 'straddle':
+            call_strike, put_strike = atm_strike, atm_strike
+        elif self.strategy == 'strangle':
+            put_strike, call_strike = self.getStranglePrices(atm_strike = atm_strike,
+                                                             interval = parameters['interval'])
+        else:
+            time_of_day, straddle = self.pairedPremium(call_strike = atm_strike, put_strike = atm_strike, **leg)
+            entry_straddle = straddle[time_of_day == start]
+            if len(entry_straddle) == 0:
+                return None
+            width = float(entry_straddle[0])*parameters['straddle_multiplier']
+            call_strike = int(self.nearestAtm(spot + width, interval = strike_interval))
+            put_strike = int(self.nearestAtm(spot - width, interval = strike_interval))
+
+        time_of_day, premium = self.pairedPremium(call_strike = call_strike, put_strike = put_strike, **leg)
+        tradable = (time_of_day >= start) & (time_of_day <= end)
+        if not tradable.any():
+            return None
+
+        session_end = np.zeros(len(time_of_day), dtype = bool)
+        session_end[np.flatnonzero(tradable)[-1]] = True
+
+        if self.strategy == 'strangle_dma':
+            dma = np.nan_to_num(SimpleMovingAverage(window = int(parameters['window_period'])).batch(premium), nan = 0.0)
+            entry_rule, exit_rule = premium < dma, premium > dma
+        else:
+            entry_rule, exit_rule = time_of_day == start, None
+
+        positions = self.engine.run(frame = pd.DataFrame({'premium': premium}),
+                                    premium_column = 'premium',
+                                    entry_rule = entry_rule,
+                                    exit_rule = exit_rule,
+                                    session_end_rule = session_end,
+                                    tradable_rule = tradable)
+        return {
+            'pnl': float(positions['pnl'].sum()),
+            'trades': int((positions['entry'] != 0).sum()),
+            'max_pnl': float(positions['max_pnl'].max()),
+            'min_pnl': float(positions['min_pnl'].min()),
+        }
+
+    def __call__(self, day, day_df):
+        if day_df.empty:
+            return None
+
+        chain_index = OptionChainIndex(df = day_df)
+        expiry = chain_index.nearestExpiry(day)
+        time_of_day = self.timeOfDayValues(chain_index.data)
+        spot_at = pd.Series(chain_index.data['spot'].to_numpy(dtype = np.float64)).groupby(time_of_day).first().to_dict()
+        strike_interval = self.strikeInterval(df = day_df) if self.strike_interval is None else self.strike_interval
+
+        pairs = {}
+        rows = []
+        for combination_id, parameters in enumerate(self.combinations):
+            result = self.evaluate(pairs = pairs,
+                                   chain_index = chain_index,
+                                   day = day,
+                                   expiry = expiry,
+                                   spot_at = spot_at,
+                                   parameters = parameters,
+                                   strike_interval = strike_interval)
+            if result is not None:
+                rows.append({'combination_id': combination_id, 'day': day, **result})
+        return pd.DataFrame(rows)
+
+
+class ParameterSweep:
+    """
+    Grid search over the strategy parameters. The data is mapped and sharded by day once,
+    each day task evaluates every combination (see SweepDayEvaluator) and the per day
+    results are merged into one table of PnL statistics per combination.
+
+    parameter_grid maps a parameter to the list of values to try, anything left out keeps
+    the default the objectives use.
+    """
+    default_grid = {
+        'straddle': {
+            'start_trade_time': ['09:30:00'],
+            'end_trade_time': ['15:15:00'],
+        },
+        'strangle': {
+            'start_trade_time': ['09:30:00'],
+            'end_trade_time': ['15:15:00'],
+            'interval': [100],
+        },
+        'strangle_dma': {
+            'start_trade_time': ['09:30:00'],
+            'end_trade_time': ['15:15:00'],
+            'straddle_multiplier': [1.5],
+            'window_period': [30],
+        },
+    }
+
+    def __init__(self,
+                 file_path = None,
+                 strategy = 'straddle',
+                 parameter_grid = None,
+                 strike_interval = None,
+                 max_workers = None):
+        if strategy not in self.default_grid:
+            raise ValueError(fr"Unknown strategy {strategy}, has to be one of {tuple(self.default_grid)}")
+
+        grid = dict(self.default_grid[strategy])
+        unknown = set(parameter_grid or {}) - set(grid)
+        if unknown:
+            raise ValueError(fr"Parameters {sorted(unknown)} are not used by the {strategy} strategy")
+        grid.update({name: list(values) for name, values in (parameter_grid or {}).items()})
+
+        self.strategy = strategy
+        self.strike_interval = strike_interval
+        self.combinations = [dict(zip(grid.keys(), values)) for values in itertools.product(*grid.values())]
+        self.executor = DayShardedExecutor(file_path = file_path,
+                                           max_workers = max_workers,
+                                           columns = SweepDayEvaluator.columns,
+                                           prepare_function = OptionChainIndex.sortedFrame)
+
+    def run(self):
+        evaluator = SweepDayEvaluator(strategy = self.strategy,
+                                      combinations = self.combinations,
+                                      strike_interval = self.strike_interval)
+        return self.executor.run(strategy = evaluator,
+                                 merge_function = self.summarise)
+
+    """
+    One row per combination with its parameters and: days traded, trades, total/mean/std
+    of the daily pnl, win rate, annualised sharpe, max drawdown of the cumulative daily pnl,
+    best and worst day and the worst open trade MTM. Sorted by total pnl.
+    """
+    def summarise(self, day_results = None):
+        daily = [result for _, result in day_results if result is not None and not result.empty]
+        parameters = pd.DataFrame(self.combinations).astype(str)
+        parameters.index.name = 'combination_id'
+        if not daily:
+            return parameters.reset_index()
+
+        daily = pd.concat(daily, ignore_index = True).sort_values(by = ['combination_id', 'day'])
+        daily['win'] = daily['pnl'] > 0
+        cumulative_pnl = daily.groupby('combination_id')['pnl'].cumsum()
+        daily['drawdown'] = cumulative_pnl - cumulative_pnl.groupby(daily['combination_id']).cummax().clip(lower = 0)
+
+        stats = daily.groupby('combination_id').agg(days = ('pnl', 'size'),
+                                                    trades = ('trades', 'sum'),
+                                                    total_pnl = ('pnl', 'sum'),
+                                                    mean_pnl = ('pnl', 'mean'),
+                                                    std_pnl = ('pnl', 'std'),
+                                                    win_rate = ('win', 'mean'),
+                                                    max_drawdown = ('drawdown', 'min'),
+                                                    best_day = ('pnl', 'max'),
+                                                    worst_day = ('pnl', 'min'),
+                                                    worst_mtm = ('min_pnl', 'min'))
+        stats['sharpe'] = (stats['mean_pnl']/stats['std_pnl'].replace(0, np.nan))*np.sqrt(252)
+
+        return parameters.join(stats, how = 'left').reset_index().sort_values(by = 'total_pnl',
+                                                                              ascending = False,
+                                                                              na_position = 'last').reset_index(drop = True)
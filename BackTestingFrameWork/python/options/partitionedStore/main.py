@@ -0,0 +1,127 @@
+import os
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+
+class PartitionedDataStore:
+    """
+    Parquet dataset laid out as root_path/symbol=.../year=.../month=.../day=.../*.parquet
+    so a strategy only reads the days, expiries and columns it asks for. The partition
+    folders are pruned from the date range and the remaining filters are pushed down to
+    the parquet row groups.
+    """
+    partition_schema = pa.schema([('symbol', pa.string()),
+                                  ('year', pa.int16()),
+                                  ('month', pa.int8()),
+                                  ('day', pa.int8())])
+
+    def __init__(self, root_path = None):
+        if root_path is None:
+            raise ValueError("No root path provided for the PartitionedDataStore")
+        self.root_path = str(root_path)
+        self.name = self.root_path
+        self.partitioning = ds.partitioning(self.partition_schema, flavor = 'hive')
+
+    """
+    Writes a dataframe into the layout, any day which is already in the store for the
+    symbol is replaced so re-writing a day does not duplicate rows
+    """
+    def writeDataFrame(self,
+                       df = None,
+                       symbol = None,
+                       datetime_column = 'datetime',
+                       compression = 'zstd'):
+        if df is None or df.empty:
+            raise ValueError("Empty dataframe passed to writeDataFrame")
+
+        if symbol is None:
+            if 'symbol' not in df.columns:
+                raise ValueError("No symbol passed to writeDataFrame and no symbol column present")
+            symbols = df['symbol']
+        else:
+            symbols = symbol
+
+        timestamps = pd.to_datetime(df[datetime_column])
+        partitioned_df = df.drop(columns = ['symbol', 'year', 'month', 'day'], errors = 'ignore').assign(
+            symbol = symbols,
+            year = timestamps.dt.year.astype('int16'),
+            month = timestamps.dt.month.astype('int8'),
+            day = timestamps.dt.day.astype('int8'),
+        )
+
+        os.makedirs(self.root_path, exist_ok = True)
+        ds.write_dataset(pa.Table.from_pandas(partitioned_df, preserve_index = False),
+                         self.root_path,
+                         format = 'parquet',
+                         partitioning = self.partitioning,
+                         existing_data_behavior = 'delete_matching',
+                         file_options = ds.ParquetFileFormat().make_write_options(compression = compression))
+
+    def dataset(self):
+        return ds.dataset(self.root_path,
+                          format = 'parquet',
+                          partitioning = self.partitioning)
+
+    """
+    Builds a filter on the partition fields only, pyarrow can evaluate these against the
+    folder names so days outside the range are never opened
+    """
+    def dateRangeFilter(self,
+                        start_date = None,
+                        end_date = None):
+        year, month, day = ds.field('year'), ds.field('month'), ds.field('day')
+        expression = None
+
+        if start_date is not None:
+            start = pd.Timestamp(start_date)
+            after_start = ((year > start.year) |
+                           ((year == start.year) & ((month > start.month) |
+                                                    ((month == start.month) & (day >= start.day)))))
+            expression = after_start
+
+        if end_date is not None:
+            end = pd.Timestamp(end_date)
+            before_end = ((year < end.year) |
+                          ((year == end.year) & ((month < end.month) |
+                                                 ((month == end.month) & (day <= end.day)))))
+            expression = before_end if expression is None else (expression & before_end)
+
+        return expression
+
+    """
+    Reads only the requested symbol, days, expiries and columns. Extra pyarrow filter
+    expressions can be passed through filters and are combined with the rest.
+    """
+    def loadData(self,
+                 symbol = None,
+                 start_date = None,
+                 end_date = None,
+                 expiries = None,
+                 columns = None,
+                 filters = None):
+        expression = self.dateRangeFilter(start_date = start_date,
+                                          end_date = end_date)
+
+        if symbol is not None:
+            symbol_filter = ds.field('symbol') == str(symbol)
+            expression = symbol_filter if expression is None else (expression & symbol_filter)
+
+        if expiries is not None:
+            expiry_values = pa.array(pd.to_datetime(pd.Series(list(expiries))))
+            expiry_filter = ds.field('expiry').isin(expiry_values)
+            expression = expiry_filter if expression is None else (expression & expiry_filter)
+
+        if filters is not None:
+            expression = filters if expression is None else (expression & filters)
+
+        try:
+            table = self.dataset().to_table(columns = columns,
+                                            filter = expression)
+        except FileNotFoundError:
+            raise FileNotFoundError(fr"No partitioned dataset found at {self.root_path}")
+
+        df = table.to_pandas()
+        if columns is None:
+            df = df.drop(columns = ['year', 'month', 'day'])
+        return df
@@ -0,0 +1,146 @@
+import os
+import warnings
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+from strikeGrid.main import StrikeGrid
+from timeFuncs.main import OptionsTimeFunctions
+
+
+class DatasetPreprocessor(OptionsTimeFunctions):
+    """
+    Shared preprocessing stage for ReadData and InterviewTest. Every derived column is
+    computed with array arithmetic over the whole column instead of a python call per row:
+    - expiry: moved to 15:30:00 on the expiry date
+    - time_to_maturity: days from the row's date to expiry
+    - nearest_atm: spot rounded to the closest strike on the strike interval, which is
+      detected per symbol from the listed strikes unless one is passed
+    - strike_price_diff: absolute distance of the strike from spot
+    - time_of_day_ns: nanoseconds since midnight, used by the time filters
+    The derived columns can be cached next to the source file so they are only computed once.
+    """
+    derived_columns = ['expiry', 'time_to_maturity', 'nearest_atm', 'strike_price_diff', 'time_of_day_ns']
+    cache_suffix = '.derived.arrow'
+
+    def __init__(self) -> None:
+        pass
+
+    """
+    Same as setting hour = 15, minute = 30, second = 0 on every timestamp but done on the
+    whole column, anything below a second is kept just like datetime.replace does
+    """
+    def setExpiryEndOfDay(self, expiry = None):
+        expiry = pd.to_datetime(expiry)
+        sub_second = expiry - expiry.dt.floor('s')
+        return expiry.dt.normalize() + pd.Timedelta(hours = 15, minutes = 30) + sub_second
+
+    def timeToMaturity(self, expiry = None, date = None):
+        return (expiry - date).dt.total_seconds()/(3600*24)
+
+    """
+    Rounds in float64 whatever the spot dtype is (float32 spots would round to the wrong
+    strike near the midpoint) and stores the strike as an integer column. np.round rounds
+    half to even exactly like the python round used by closest_strike_price.
+    """
+    def nearestAtm(self, spot = None, interval = 100):
+        spot = np.asarray(spot, dtype = np.float64)
+        return (np.round(spot/interval)*interval).astype(np.int64)
+
+    """
+    Strike interval detected from the data (50 for NIFTY, 100 for BANKNIFTY, ...), one
+    number for a single symbol otherwise the interval of every row's symbol
+    """
+    def strikeInterval(self, df = None, default = 100):
+        intervals = {symbol: (default if interval is None else interval)
+                     for symbol, interval in StrikeGrid.detectIntervals(df = df).items()}
+        if len(intervals) == 1:
+            return next(iter(intervals.values()))
+        return df['symbol'].map(intervals).fillna(default).to_numpy(dtype = np.float64)
+
+    def strikePriceDiff(self, strike_price = None, spot = None):
+        return np.abs(strike_price - spot)
+
+    def addDerivedColumns(self, df = None, interval = None):
+        if df is None or df.empty:
+            raise ValueError("Empty dataframe passed to addDerivedColumns")
+
+        if interval is None:
+            interval = self.strikeInterval(df = df)
+
+        df['expiry'] = self.setExpiryEndOfDay(expiry = df['expiry'])
+        df['date'] = pd.to_datetime(df['date'])
+        df['time_to_maturity'] = self.timeToMaturity(expiry = df['expiry'], date = df['date'])
+        df['nearest_atm'] = self.nearestAtm(spot = df['spot'], interval = interval)
+        df['strike_price_diff'] = self.strikePriceDiff(strike_price = df['strike_price'], spot = df['spot'])
+        df[self.time_of_day_column] = self.timeOfDay(df['datetime'])
+        return df
+
+    """
+    The cache is only valid for the exact file (size and modification time), row count and
+    strike interval it was computed from, anything else recomputes and rewrites it
+    """
+    def cacheSignature(self, source_path = None, rows = None, interval = None):
+        stat = os.stat(source_path)
+        return {
+            b'source_size': str(stat.st_size).encode(),
+            b'source_mtime_ns': str(stat.st_mtime_ns).encode(),
+            b'rows': str(rows).encode(),
+            b'interval': str(interval if np.isscalar(interval) else np.unique(interval).tolist()).encode(),
+        }
+
+    def readCachedColumns(self, cache_path = None, signature = None):
+        if not os.path.exists(cache_path):
+            return None
+        try:
+            with pa.memory_map(cache_path, 'r') as source:
+                table = pa.ipc.open_file(source).read_all()
+        except (pa.ArrowInvalid, OSError):
+            return None
+
+        metadata = table.schema.metadata or {}
+        if any(metadata.get(key) != value for key, value in signature.items()):
+            return None
+        if any(column not in table.column_names for column in self.derived_columns):
+            return None
+        return table.to_pandas(split_blocks = True)
+
+    def writeCachedColumns(self, df = None, cache_path = None, signature = None):
+        table = pa.Table.from_pandas(df[self.derived_columns], preserve_index = False)
+        table = table.replace_schema_metadata(signature)
+        temporary_path = fr"{cache_path}.{os.getpid()}.tmp"
+        feather.write_feather(table, temporary_path, compression = 'uncompressed')
+        os.replace(temporary_path, cache_path)
+
+    """
+    Adds the derived columns to df, reading them from <source_path>.derived.arrow when the
+    cache matches the source file, otherwise computing them and writing the cache
+    """
+    def preprocess(self,
+                   df = None,
+                   source_path = None,
+                   interval = None,
+                   use_cache = True):
+        if interval is None:
+            interval = self.strikeInterval(df = df)
+
+        if source_path is None or not use_cache or not os.path.isfile(str(source_path)):
+            return self.addDerivedColumns(df = df, interval = interval)
+
+        cache_path = os.path.splitext(str(source_path))[0] + self.cache_suffix
+        signature = self.cacheSignature(source_path = str(source_path), rows = len(df), interval = interval)
+
+        cached = self.readCachedColumns(cache_path = cache_path, signature = signature)
+        if cached is not None:
+            df['date'] = pd.to_datetime(df['date'])
+            for column in self.derived_columns:
+                df[column] = cached[column].to_numpy()
+            return df
+
+        df = self.addDerivedColumns(df = df, interval = interval)
+        try:
+            self.writeCachedColumns(df = df, cache_path = cache_path, signature = signature)
+        except OSError as e:
+            # the columns are computed already, a read only data dir only costs the cache
+            warnings.warn(fr"Could not write the derived column cache {cache_path}: {e}", RuntimeWarning, stacklevel = 2)
+        return df
@@ -1,17 +1,54 @@
+import os
 import pandas as pd
 import numpy as np
+from partitionedStore.main import PartitionedDataStore
+from preprocessing.main import DatasetPreprocessor
 
-class ReadData:
-    def __init__(self, file_path = None):
+class ReadData(DatasetPreprocessor):
+    """
+    file_path can also be the root of a PartitionedDataStore, in that case only the
+    symbol, days (start_date to end_date), expiries and columns asked for are read.
+    A data_source (e.g. MongoDataSource) is read the same way instead of a file, its name
+    is used in the messages and the derived columns are not cached since there is no file
+    to key the cache on.
+    """
+    def __init__(self,
+                 file_path = None,
+                 symbol = None,
+                 start_date = None,
+                 end_date = None,
+                 expiries = None,
+                 columns = None,
+                 cache_derived_columns = True,
+                 data_source = None):
 
-        if file_path is None:
+        if file_path is None and data_source is None:
             print("No file path provided.")
             return
         
-        file_extension = file_path.split('.')[-1].lower()
+        self.df = None
+        if data_source is not None:
+            file_extension = 'data source'
+        else:
+            file_extension = file_path.split('.')[-1].lower()
 
         try:
-            if file_extension == 'json':
+            if data_source is not None:
+                self.df = data_source.loadData(symbol = symbol,
+                                               start_date = start_date,
+                                               end_date = end_date,
+                                               expiries = expiries,
+                                               columns = columns)
+                print(fr"{data_source.name} data loaded successfully.")
+            elif os.path.isdir(file_path):
+                file_extension = 'partitioned dataset'
+                self.df = PartitionedDataStore(root_path = file_path).loadData(symbol = symbol,
+                                                                               start_date = start_date,
+                                                                               end_date = end_date,
+                                                                               expiries = expiries,
+                                                                               columns = columns)
+                print("Partitioned dataset loaded successfully.")
+            elif file_extension == 'json':
                 self.df = pd.read_json(file_path)
                 print("JSON file loaded successfully.")
             elif file_extension == 'csv':
@@ -39,13 +76,11 @@ class ReadData:
             raise ValueError("No valid file path provided or files could not be loaded.")
 
         try:
-            self.df['expiry'] = pd.to_datetime(self.df['expiry'])
-            self.df['date'] = pd.to_datetime(self.df['date'])
-            # set_time_to_end_of_day this function sets the expiry to the eod of the expiry date
-            self.df['expiry'] = self.df['expiry'].apply(self.set_time_to_end_of_day)
-            self.df['time_to_maturity'] = (self.df['expiry']-self.df['date']).dt.total_seconds()/(3600*24)
-            self.df['nearest_atm'] = self.df['spot'].apply(self.closest_strike_price)
-            self.df['strike_price_diff'] = np.abs(self.df['strike_price'] - self.df['spot'])
+            # expiry is set to the eod of the expiry date and the other derived columns are added
+            # in one vectorised pass, cached next to the file when it is a single file
+            self.df = self.preprocess(df = self.df,
+                                      source_path = file_path if data_source is None and os.path.isfile(file_path) else None,
+                                      use_cache = cache_derived_columns)
         except Exception as e:
             raise KeyError("Something went wrong in class initialisation of Interview Test")
 
@@ -0,0 +1,142 @@
+import os
+import queue
+import threading
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.ipc as ipc
+
+
+class ResultWriter:
+    """
+    Result sink for the per day outputs of a backtest. write() only puts the dataframe on a
+    bounded queue, a background thread converts it to arrow, buffers it and writes a batch
+    once flush_rows rows are buffered, so the output I/O overlaps with the next day's compute.
+    The frames passed to write() should not be modified afterwards.
+
+    Formats:
+    - parquet: one hive partitioned dataset root_path/day=YYYY-MM-DD/*.parquet, a day which
+      is written again (e.g. on a re-run) replaces the old files of that day, so every day
+      has to be passed to write() in one piece
+    - arrow: one arrow IPC stream per writer, root_path/part-<pid>-<id>.arrows, with a
+      day column
+    - csv: the old layout, one root_path/YYYY-MM-DD.csv per day
+    """
+    formats = ('parquet', 'arrow', 'csv')
+
+    def __init__(self,
+                 root_path = None,
+                 output_format = 'parquet',
+                 compression = 'zstd',
+                 flush_rows = 100000,
+                 queue_size = 64,
+                 partition_column = 'day'):
+        if root_path is None:
+            raise ValueError("No root path provided for the ResultWriter")
+        if output_format not in self.formats:
+            raise ValueError(fr"Unknown output format {output_format}, has to be one of {self.formats}")
+
+        self.root_path = str(root_path)
+        self.output_format = output_format
+        self.compression = compression
+        self.flush_rows = int(flush_rows)
+        self.partition_column = partition_column
+        self.writer_id = fr"{os.getpid()}-{id(self):x}"
+
+        self.buffer = []
+        self.buffered_rows = 0
+        self.flush_count = 0
+        self.schema = None
+        self.stream = None
+        self.sink = None
+        self.error = None
+
+        os.makedirs(self.root_path, exist_ok = True)
+        self.queue = queue.Queue(maxsize = queue_size)
+        self.thread = threading.Thread(target = self.writeLoop, daemon = True)
+        self.thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def write(self, key = None, df = None):
+        if self.error is not None:
+            raise RuntimeError(fr"ResultWriter for {self.root_path} failed: {self.error}")
+        if df is None or df.empty:
+            return
+        self.queue.put((str(key), df))
+
+    """
+    Flushes whatever is still buffered and waits for the background thread to finish
+    """
+    def close(self):
+        if self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join()
+        if self.error is not None:
+            raise RuntimeError(fr"ResultWriter for {self.root_path} failed: {self.error}")
+
+    def writeLoop(self):
+        closing = False
+        try:
+            while not closing:
+                item = self.queue.get()
+                if item is None:
+                    closing = True
+                else:
+                    self.append(*item)
+            self.flush()
+        except Exception as e:
+            self.error = e
+            """
+            Keep draining so write() and close() never block on a dead writer
+            """
+            while not closing:
+                closing = self.queue.get() is None
+        finally:
+            if self.stream is not None:
+                self.stream.close()
+                self.sink.close()
+
+    def append(self, key = None, df = None):
+        if self.output_format == 'csv':
+            df.to_csv(os.path.join(self.root_path, fr"{key}.csv"), index = False)
+            return
+
+        table = pa.Table.from_pandas(df, preserve_index = False)
+        table = table.append_column(self.partition_column, pa.array([key]*len(table), pa.string()))
+        if self.schema is None:
+            self.schema = table.schema
+        elif table.schema != self.schema:
+            table = table.cast(self.schema)
+
+        self.buffer.append(table)
+        self.buffered_rows += len(table)
+        if self.buffered_rows >= self.flush_rows:
+            self.flush()
+
+    def flush(self):
+        if not self.buffer:
+            return
+        table = pa.concat_tables(self.buffer)
+        self.buffer = []
+        self.buffered_rows = 0
+
+        if self.output_format == 'parquet':
+            ds.write_dataset(table,
+                             self.root_path,
+                             format = 'parquet',
+                             partitioning = ds.partitioning(pa.schema([(self.partition_column, pa.string())]), flavor = 'hive'),
+                             basename_template = fr"part-{self.writer_id}-{self.flush_count}-{{i}}.parquet",
+                             existing_data_behavior = 'delete_matching',
+                             file_options = ds.ParquetFileFormat().make_write_options(compression = self.compression))
+        else:
+            if self.stream is None:
+                self.sink = pa.OSFile(os.path.join(self.root_path, fr"part-{self.writer_id}.arrows"), 'wb')
+                self.stream = ipc.new_stream(self.sink,
+                                             self.schema,
+                                             options = ipc.IpcWriteOptions(compression = self.compression))
+            self.stream.write_table(table)
+        self.flush_count += 1
@@ -14,8 +14,18 @@ class Straddle:
                             strike_price = None,
                             start_trade_time = None,
                             end_trade_time = None,
+                            chain_index = None,
                             ): 
         
+        """
+        With a prebuilt OptionChainIndex only the two legs for the day in time are sliced
+        out of the index, so the masks below run over the legs instead of the full data
+        """
+        if chain_index is not None:
+            data = pd.concat(chain_index.getStraddleLegs(day = time,
+                                                         expiry = expiry,
+                                                         strike_price = strike_price))
+
         time = pd.to_datetime(str(time)).time()
         try:
             # dont add an if to check data empty its already being checked in TimeFilter
@@ -1,7 +1,7 @@
 import pandas as pd
 import numpy as np
 
-class Straddle:
+class Strangle:
     def __init__(self) -> None:
         pass
 
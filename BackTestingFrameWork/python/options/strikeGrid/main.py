@@ -0,0 +1,155 @@
+import numpy as np
+import pandas as pd
+from scipy.special import ndtri
+
+
+class StrikeGrid:
+    """
+    Sorted strike ladder of every (symbol, expiry) in the data, built once so that strikes
+    are resolved for whole arrays of spot prices with searchsorted instead of a python min()
+    over the strike list per spot. The strike interval of every symbol (50 for NIFTY, 100
+    for BANKNIFTY, ...) is detected as the most common gap between neighbouring listed strikes.
+
+    symbol and expiry can be left out when the grid holds a single symbol/expiry.
+    """
+    def __init__(self,
+                 df = None,
+                 symbol_column = 'symbol',
+                 expiry_column = 'expiry',
+                 strike_column = 'strike_price'):
+        if df is None or df.empty:
+            raise ValueError("Empty dataframe passed to StrikeGrid")
+
+        symbols = df[symbol_column] if symbol_column in df.columns else pd.Series(None, index = df.index, dtype = object)
+        expiries = df[expiry_column] if expiry_column in df.columns else pd.Series(pd.NaT, index = df.index)
+        strikes = pd.DataFrame({'symbol': symbols.to_numpy(),
+                                'expiry': pd.to_datetime(expiries).to_numpy(),
+                                'strike_price': df[strike_column].to_numpy()}).drop_duplicates()
+
+        self.ladders = {}
+        for (symbol, expiry), group in strikes.groupby(['symbol', 'expiry'], dropna = False, sort = True):
+            symbol = None if pd.isna(symbol) else symbol
+            self.ladders[(symbol, pd.Timestamp(expiry))] = np.sort(group['strike_price'].to_numpy(dtype = np.float64))
+
+        self.intervals = self.detectIntervals(df = strikes)
+
+    """
+    Most common positive gap between neighbouring strikes, None when there is no gap to look at
+    """
+    @staticmethod
+    def detectInterval(strikes = None):
+        strikes = np.unique(np.asarray(strikes, dtype = np.float64))
+        gaps = np.round(np.diff(strikes[~np.isnan(strikes)]), 6)
+        if len(gaps) == 0:
+            return None
+        values, counts = np.unique(gaps, return_counts = True)
+        interval = float(values[np.argmax(counts)])
+        return int(interval) if interval.is_integer() else interval
+
+    """
+    {symbol: interval} over all the strikes listed for each symbol, the key is None when
+    there is no symbol column. Only the distinct strikes are looked at so this is cheap
+    enough to run on the full dataset at load time.
+    """
+    @staticmethod
+    def detectIntervals(df = None, symbol_column = 'symbol', strike_column = 'strike_price'):
+        if symbol_column not in df.columns:
+            return {None: StrikeGrid.detectInterval(pd.unique(df[strike_column]))}
+        return {(None if pd.isna(symbol) else symbol): StrikeGrid.detectInterval(pd.unique(strikes))
+                for symbol, strikes in df.groupby(symbol_column, dropna = False, sort = False)[strike_column]}
+
+    def interval(self, symbol = None, default = 100):
+        if symbol is None and len(self.intervals) == 1:
+            symbol = next(iter(self.intervals))
+        interval = self.intervals.get(symbol)
+        return default if interval is None else interval
+
+    def ladder(self, symbol = None, expiry = None):
+        key_symbols = {key_symbol for key_symbol, _ in self.ladders}
+        if symbol is None and len(key_symbols) == 1:
+            symbol = next(iter(key_symbols))
+        if expiry is None:
+            expiries = [key_expiry for key_symbol, key_expiry in self.ladders if key_symbol == symbol]
+            if len(expiries) != 1:
+                raise KeyError(fr"An expiry has to be passed, {symbol} has {len(expiries)} expiries in the StrikeGrid")
+            expiry = expiries[0]
+        try:
+            return self.ladders[(symbol, pd.Timestamp(expiry))]
+        except KeyError:
+            raise KeyError(fr"No strikes for {symbol} {expiry} in the StrikeGrid")
+
+    """
+    Index of the listed strike closest to every price, a price exactly between two strikes
+    goes to the lower one (the first one min() would pick on the sorted list)
+    """
+    @staticmethod
+    def nearestIndex(ladder = None, prices = None):
+        prices = np.asarray(prices, dtype = np.float64)
+        upper = np.clip(np.searchsorted(ladder, prices, side = 'left'), 1, len(ladder) - 1) if len(ladder) > 1 else np.zeros(prices.shape, dtype = np.intp)
+        lower = np.maximum(upper - 1, 0)
+        take_upper = np.abs(ladder[upper] - prices) < np.abs(prices - ladder[lower])
+        return np.where(take_upper, upper, lower)
+
+    def nearestStrikes(self, prices = None, symbol = None, expiry = None):
+        ladder = self.ladder(symbol = symbol, expiry = expiry)
+        return ladder[self.nearestIndex(ladder = ladder, prices = prices)]
+
+    def atmStrikes(self, spot = None, symbol = None, expiry = None):
+        return self.nearestStrikes(prices = spot, symbol = symbol, expiry = expiry)
+
+    """
+    Strike steps rungs away from ATM along the listed ladder, positive steps are out of the
+    money (above ATM for calls, below for puts) and negative steps in the money. NaN when
+    the ladder does not go that far.
+    """
+    def offsetStrikes(self, spot = None, steps = 1, option_type = 'c', symbol = None, expiry = None):
+        ladder = self.ladder(symbol = symbol, expiry = expiry)
+        direction = 1 if option_type in ('c', 'CE') else -1
+        index = self.nearestIndex(ladder = ladder, prices = spot) + direction*np.asarray(steps)
+        inside = (index >= 0) & (index < len(ladder))
+        return np.where(inside, ladder[np.clip(index, 0, len(ladder) - 1)], np.nan)
+
+    def otmStrikes(self, spot = None, steps = 1, option_type = 'c', symbol = None, expiry = None):
+        return self.offsetStrikes(spot = spot, steps = abs(steps), option_type = option_type, symbol = symbol, expiry = expiry)
+
+    def itmStrikes(self, spot = None, steps = 1, option_type = 'c', symbol = None, expiry = None):
+        return self.offsetStrikes(spot = spot, steps = -abs(steps), option_type = option_type, symbol = symbol, expiry = expiry)
+
+    """
+    Listed strike whose Black-Scholes delta is closest to target_delta (0.25 for a 25 delta
+    call, -0.25 for a 25 delta put). Delta is monotonic in the strike so the strike with
+    exactly that delta is solved in closed form from d1 = N^-1(delta) (N^-1(delta + 1)
+    for puts) and then snapped to the ladder with searchsorted.
+    """
+    def deltaNearestStrikes(self,
+                            spot = None,
+                            target_delta = None,
+                            time_to_maturity = None,
+                            option_type = 'c',
+                            sigma = 0.2,
+                            rate_of_interest = 7/100,
+                            symbol = None,
+                            expiry = None):
+        spot = np.asarray(spot, dtype = np.float64)
+        time_to_maturity = np.asarray(time_to_maturity, dtype = np.float64)
+        sigma = np.asarray(sigma, dtype = np.float64)
+        target_delta = np.asarray(target_delta, dtype = np.float64)
+
+        if option_type in ('c', 'CE'):
+            d1 = ndtri(target_delta)
+        elif option_type in ('p', 'PE'):
+            d1 = ndtri(target_delta + 1)
+        else:
+            raise ValueError("Invalid Option Type")
+
+        sigma_root_time = sigma*np.sqrt(time_to_maturity)
+        strike = spot*np.exp(-(d1*sigma_root_time) + (rate_of_interest + (sigma**2)/2)*time_to_maturity)
+        return self.nearestStrikes(prices = strike, symbol = symbol, expiry = expiry)
+
+    """
+    Rounds prices to the symbol's strike interval without looking at the listed strikes,
+    the vectorised form of closest_strike_price (numpy rounds half to even like round())
+    """
+    def roundToInterval(self, prices = None, symbol = None, interval = None):
+        interval = self.interval(symbol = symbol) if interval is None else interval
+        return (np.round(np.asarray(prices, dtype = np.float64)/interval)*interval).astype(np.int64)
@@ -7,15 +7,37 @@ import numpy as np
 from scipy.stats import norm
 from datetime import datetime
 import os
+import sys
 import csv
-from concurrent.futures import ProcessPoolExecutor
+import copy
+
+# Just pointing the path to parent dir for imports
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__),os.pardir))
+
+sys.path.insert(0,parent_dir)
+
+from impliedVolatility.main import ImpliedVolatility
+from chainIndex.main import OptionChainIndex
+from partitionedStore.main import PartitionedDataStore
+from memoryMappedData.main import MemoryMappedDataset
+from preprocessing.main import DatasetPreprocessor
+from backtestEngine.main import BacktestEngine
+from dayShardedExecutor.main import DayShardedExecutor
+from resultWriter.main import ResultWriter
+from indicators.main import RelativeStrengthIndex, SimpleMovingAverage
+from strikeGrid.main import StrikeGrid
 
 # ----------------------------------------------------------------------------------------------------------------------------------------------------------------------
 """
 These are all the basic formulas which dont need to be changed 
 and will be all called into the InterviewTest class
 """
-class BaseFormulas:
+class BaseFormulas(ImpliedVolatility, DatasetPreprocessor):
+    """
+    Overwritten by InterviewTest with the interval detected from the loaded strikes
+    """
+    strike_interval = 100
+
     def __init__(self):
         pass
 
@@ -27,8 +49,7 @@ class BaseFormulas:
         if not any([start,end,data]):
             raise ValueError("Empty parameters passed to the apply_time_mask function")
         
-        mask = ((data['datetime'].dt.time >= start) & (data['datetime'].dt.time <= end))
-        return data[mask]
+        return data[self.timeWindowMask(data = data, start = start, end = end)]
     """
     This function is made to find the nearest atm strike price
     """
@@ -39,6 +60,10 @@ class BaseFormulas:
         return (call_data, put_data)
 
 
+    """
+    The objectives only read the day groups, so the frame is grouped as it is instead of a
+    deep copy, a memory mapped frame then stays shared in the page cache
+    """
     def group_df_daily(
                     self,
                     data = None
@@ -47,13 +72,18 @@ class BaseFormulas:
         
         
     def find_nearest_atm_strike(self, spot_price = None, strike_prices = None):
-        return min(strike_prices, key = lambda x: abs(x-spot_price))
+        ladder = np.unique(np.asarray(strike_prices))
+        strikes = ladder[StrikeGrid.nearestIndex(ladder = ladder, prices = spot_price)]
+        return strikes.item() if np.ndim(strikes) == 0 else strikes
     """
     This function is made to find the closest strike price for the old dataset 
-    it might be used once or twice later below to get the otms closes strikes
+    it might be used once or twice later below to get the otms closes strikes,
+    takes a single price or an array of prices
     """     
-    def closest_strike_price(self, price, interval = 100):
-        return int(round(price/interval)*interval)
+    def closest_strike_price(self, price, interval = None):
+        interval = self.strike_interval if interval is None else interval
+        strikes = (np.round(np.asarray(price, dtype = np.float64)/interval)*interval).astype(np.int64)
+        return int(strikes) if strikes.ndim == 0 else strikes
     """
     I had added this since the first data given did not have the premium price, so i was 
     going to make the premiums column assuming a fixed volatility, since however the new dataset 
@@ -76,6 +106,23 @@ class BaseFormulas:
             return float(((strike_price*np.exp(-rate_of_interest*time_to_maturity)*norm.cdf(-d2)) - (spot_price*norm.cdf(-d1))))
         else:
             raise ValueError("Invalid Option Type")
+    """
+    Batched version of black_scholes above, takes numpy arrays or dataframe columns
+    and returns the call and put premiums for every row in one vectorised pass
+    """
+    def black_scholes_batch(self,
+                            strike_price = None,
+                            spot_price = None,
+                            time_to_maturity = None,
+                            rate_of_interest = 7/100,
+                            sigma = 0.2,
+                            dtype = np.float64):
+        return self.calculateOptionPremiums(strike_price = strike_price,
+                                            spot_price = spot_price,
+                                            time_to_maturity = time_to_maturity,
+                                            rate_of_interest = rate_of_interest,
+                                            sigma = sigma,
+                                            dtype = dtype)
       
     """
     This function is made to trim the timestamp in the expiry 
@@ -92,24 +139,16 @@ class BaseFormulas:
     
     """
     This code makes a masked series for avg loos and avg giain 
-    and returns it be put into a new column of a dataframe
+    and returns it be put into a new column of a dataframe, the logic lives in
+    indicators.RelativeStrengthIndex so the live feed can update the same rsi tick by tick
     """
     def calculate_rsi(self,
                       data, 
                       window=30):
         if data.empty:
             raise ValueError
-        delta = data.diff()
-        gain = (delta.where(delta > 0, 0)).fillna(0)
-        loss = (-delta.where(delta < 0, 0)).fillna(0)
-
-        avg_gain = gain.rolling(window=window, min_periods=1).mean()
-        avg_loss = loss.rolling(window=window, min_periods=1).mean()
-
-        rs = avg_gain / avg_loss
-        rsi = 100 - (100 / (1 + rs))
-
-        return rsi
+        return pd.Series(RelativeStrengthIndex(window = window).batch(data.to_numpy()),
+                         index = data.index)
 
 # ----------------------------------------------------------------------------------------------------------------------------------------------------------------------
 """
@@ -130,7 +169,17 @@ class ObjTwoFormulas:
                                 nearest_strike_price = None,
                                 start_trade_time = None,
                                 end_trade_time = None,
+                                chain_index = None,
                                 ): 
+        """
+        With the chain index only the two straddle legs of the day are sliced out, so the
+        time mask and the filters below run over the legs instead of the whole day
+        """
+        if chain_index is not None:
+            grouped_data = pd.concat(chain_index.getStraddleLegs(day = time,
+                                                                 expiry = nearest_expiry,
+                                                                 strike_price = nearest_strike_price))
+
         time = pd.to_datetime(str(time)).time()
         grouped_data = self.appply_time_mask(data = grouped_data,
                                             start = start_trade_time,
@@ -161,8 +210,9 @@ class ObjThreeFormulas(BaseFormulas):
     """
     def find_otms_strikes_obj_three(self,
                           atm_strike = None,
-                          interval = 100):
+                          interval = None):
         
+        interval = self.strike_interval if interval is None else interval
         if not any([atm_strike,interval]):
             raise ValueError("Empty parameters passed to the find_otms_strikes function")
         
@@ -176,7 +226,9 @@ class ObjThreeFormulas(BaseFormulas):
     """
     def slice_otms_obj_three(self,
                    df = None,
-                   start_trade_time = None):
+                   start_trade_time = None,
+                   chain_index = None,
+                   interval = None):
         
         if not any([start_trade_time, df]):
             raise ValueError("Items passed toslice_otms_obj_three() are empty")
@@ -184,21 +236,29 @@ class ObjThreeFormulas(BaseFormulas):
         df.reset_index(drop = True, inplace = True)
 
         call_data = df[df['option_type'] == 'c']
-        start_trade_data = call_data[call_data['datetime'].dt.time == start_trade_time]
+        start_trade_data = call_data[self.timeWindowMask(data = call_data, start = start_trade_time, end = start_trade_time)]
 
         """
         Gets the nearest atm from the first row for the column nearest_atm
         """
-        nearest_atm = start_trade_data.at[0, 'nearest_atm']
+        nearest_atm = start_trade_data['nearest_atm'].iloc[0]
 
         try:
-            lower_atm, upper_atm = self.find_otms_strikes_obj_three(atm_strike = nearest_atm)
+            lower_atm, upper_atm = self.find_otms_strikes_obj_three(atm_strike = nearest_atm,
+                                                                      interval = interval)
         except Exception as e:
             raise IndexError("Error in slice_otms_obj_three() function")
         
         # to find the nearest expiry applying min on the expiry column 
         nearest_expiry = start_trade_data['expiry'].min()
 
+        if chain_index is not None:
+            day = start_trade_data['datetime'].iloc[0]
+            atm_data = chain_index.getLeg(day, nearest_expiry, 'c', nearest_atm).reset_index(drop = True)
+            low_otm_data = chain_index.getLeg(day, nearest_expiry, 'c', lower_atm).reset_index(drop = True)
+            up_otm_data = chain_index.getLeg(day, nearest_expiry, 'c', upper_atm).reset_index(drop = True)
+            return (atm_data, low_otm_data, up_otm_data)
+
         call_df = call_data[call_data['expiry'] == nearest_expiry].sort_values(by = 'datetime').reset_index(drop = True)
         atm_data = call_df[call_df['strike_price'] == nearest_atm].sort_values(by = 'datetime').reset_index(drop = True)
         low_otm_data = call_df[call_df['strike_price'] == lower_atm].sort_values(by = 'datetime').reset_index(drop = True)
@@ -226,7 +286,7 @@ class ObjFourFormulas(BaseFormulas):
     def start_trade_df_obj_four(self,
                                 df = None,
                      start_trade_time = pd.to_datetime("09:30:00").time()):
-        df = df[(df['datetime'].dt.time == start_trade_time) & (df['expiry'] == df['expiry'].min())]
+        df = df[self.timeWindowMask(data = df, start = start_trade_time, end = start_trade_time) & (df['expiry'] == df['expiry'].min())]
         nearest_atm_strike = int(df.iloc[0]['nearest_atm'])
         nearest_atm_expiry = df['expiry'].min()
         spot = df.iloc[0]['spot']
@@ -238,20 +298,32 @@ class ObjFourFormulas(BaseFormulas):
     """
     def filter_df_obj_four(self,
                            data = None,
-                           start_trade_time = pd.to_datetime("09:30:00").time()):
+                           start_trade_time = pd.to_datetime("09:30:00").time(),
+                           chain_index = None,
+                           straddle_multiplier = 1.5):
         try:
             nearest_atm_strike ,nearest_atm_expiry, spot = self.start_trade_df_obj_four(df = data, 
                                                                                     start_trade_time = start_trade_time)
         except Exception as e:
             raise ValueError(fr"Calling start_trade_df_obj_four() from filter_df_obj_four() is giving an error: {e}")
 
-        call_close = data[(data['strike_price'] == nearest_atm_strike) & (data['expiry'] == nearest_atm_expiry) & (data['datetime'].dt.time == start_trade_time) & (data['option_type'] == 'c')].iloc[0]['close']
-        put_close = data[(data['strike_price'] == nearest_atm_strike) & (data['expiry'] == nearest_atm_expiry) & (data['datetime'].dt.time == start_trade_time) & (data['option_type'] == 'p')].iloc[0]['close']
+        if chain_index is not None:
+            return self.filter_df_from_index_obj_four(data = data,
+                                                      chain_index = chain_index,
+                                                      nearest_atm_strike = nearest_atm_strike,
+                                                      nearest_atm_expiry = nearest_atm_expiry,
+                                                      spot = spot,
+                                                      start_trade_time = start_trade_time,
+                                                      straddle_multiplier = straddle_multiplier)
+
+        start_trade_mask = self.timeWindowMask(data = data, start = start_trade_time, end = start_trade_time)
+        call_close = data[(data['strike_price'] == nearest_atm_strike) & (data['expiry'] == nearest_atm_expiry) & start_trade_mask & (data['option_type'] == 'c')].iloc[0]['close']
+        put_close = data[(data['strike_price'] == nearest_atm_strike) & (data['expiry'] == nearest_atm_expiry) & start_trade_mask & (data['option_type'] == 'p')].iloc[0]['close']
         straddle_price = float(call_close + put_close)
 
         try:    
-            call_strike = self.closest_strike_price(price = float((straddle_price*1.5) + spot))
-            put_strike = self.closest_strike_price(price = float(spot-(straddle_price*1.5)))
+            call_strike = self.closest_strike_price(price = float((straddle_price*straddle_multiplier) + spot))
+            put_strike = self.closest_strike_price(price = float(spot-(straddle_price*straddle_multiplier)))
         except Exception as e:
             raise ValueError(fr"Calling closest_strike_price() from filter_df_obj_four() is giving an error: {e}")
 
@@ -261,6 +333,36 @@ class ObjFourFormulas(BaseFormulas):
 
         return (call_data, call_strike, put_data, put_strike)
 
+    """
+    Same logic as filter_df_obj_four but every leg is sliced from the chain index
+    """
+    def filter_df_from_index_obj_four(self,
+                                      data = None,
+                                      chain_index = None,
+                                      nearest_atm_strike = None,
+                                      nearest_atm_expiry = None,
+                                      spot = None,
+                                      start_trade_time = pd.to_datetime("09:30:00").time(),
+                                      straddle_multiplier = 1.5):
+        day = data['datetime'].iloc[0]
+        atm_call, atm_put = chain_index.getStraddleLegs(day = day,
+                                                        expiry = nearest_atm_expiry,
+                                                        strike_price = nearest_atm_strike)
+        call_close = self.timeWindowSlice(data = atm_call, start = start_trade_time, end = start_trade_time).iloc[0]['close']
+        put_close = self.timeWindowSlice(data = atm_put, start = start_trade_time, end = start_trade_time).iloc[0]['close']
+        straddle_price = float(call_close + put_close)
+
+        try:    
+            call_strike = self.closest_strike_price(price = float((straddle_price*straddle_multiplier) + spot))
+            put_strike = self.closest_strike_price(price = float(spot-(straddle_price*straddle_multiplier)))
+        except Exception as e:
+            raise ValueError(fr"Calling closest_strike_price() from filter_df_from_index_obj_four() is giving an error: {e}")
+
+        call_data = chain_index.getLeg(day, nearest_atm_expiry, 'c', call_strike).reset_index(drop = True)
+        put_data = chain_index.getLeg(day, nearest_atm_expiry, 'p', put_strike).reset_index(drop = True)
+
+        return (call_data, call_strike, put_data, put_strike)
+
 # ----------------------------------------------------------------------------------------------------------------------------------------------------------------------
 """
 This class will execute the logic of the test inheriting all the functions from 
@@ -271,7 +373,17 @@ class InterviewTest(ObjTwoFormulas,
                     ObjFourFormulas,
                     BaseFormulas):
     def __init__(self,
-                 feather_file_path = "/Users/siddhanthmate/Desktop/AllFiles/Interview/calculations/combined_data_BN.feather"):
+                 feather_file_path = "/Users/siddhanthmate/Desktop/AllFiles/Interview/calculations/combined_data_BN.feather",
+                 compute_implied_volatility = False,
+                 store_filters = None,
+                 memory_map = False,
+                 columns = None,
+                 cache_derived_columns = True,
+                 df = None,
+                 output_format = 'parquet',
+                 output_compression = 'zstd',
+                 output_flush_rows = 100000,
+                 data_source = None):
         
         """
         Here i am just inheriting the methods from 'Formulas' i thought this would be 
@@ -285,8 +397,36 @@ class InterviewTest(ObjTwoFormulas,
         enter in the class.
         """
         
+        """
+        If the path is the root of a partitioned parquet store only the days, expiries and
+        columns in store_filters (symbol, start_date, end_date, expiries, columns) are read.
+        A data_source (e.g. MongoDataSource) is read the same way with its loadData and
+        replaces the file.
+        """
+        data_source_path = None
         try:
-            self.df = pd.read_feather(str(feather_file_path))
+            if df is not None:
+                """
+                Data handed over directly, e.g. one day shard from DayShardedExecutor
+                """
+                self.df = df
+            elif data_source is not None:
+                self.df = data_source.loadData(**(store_filters or {}))
+            elif os.path.isdir(str(feather_file_path)):
+                self.df = PartitionedDataStore(root_path = str(feather_file_path)).loadData(**(store_filters or {}))
+            elif memory_map:
+                """
+                Maps an uncompressed arrow copy of the file so every worker process shares
+                one page cached copy and only materialises the columns it uses. The copy is
+                written in chain index order so the index below does not copy any column.
+                """
+                mapped_dataset = MemoryMappedDataset(file_path = str(feather_file_path),
+                                                     prepare_function = OptionChainIndex.sortedFrame)
+                self.df = mapped_dataset.toDataFrame(columns = columns)
+                data_source_path = mapped_dataset.file_path
+            else:
+                self.df = pd.read_feather(str(feather_file_path), columns = columns)
+                data_source_path = str(feather_file_path)
         except FileNotFoundError:
             raise FileNotFoundError("File does not exist")
         except Exception as e:
@@ -300,17 +440,92 @@ class InterviewTest(ObjTwoFormulas,
         - nearest_atm: applies a function to the spot to find the closed atm strike based on the interval of the 
         strikes and the spot
         - time_to_maturity: gets the float of the time in number of days to expiry from current datetime
+        These are computed on whole columns by DatasetPreprocessor and cached next to the data file
+        so they are only computed again when the file changes
         """
         try:
-            self.df['expiry'] = pd.to_datetime(self.df['expiry'])
-            self.df['date'] = pd.to_datetime(self.df['date'])
-            self.df['expiry'] = self.df['expiry'].apply(self.set_time_to_end_of_day)
-            self.df['time_to_maturity'] = (self.df['expiry']-self.df['date']).dt.total_seconds()/(3600*24)
-            self.df['nearest_atm'] = self.df['spot'].apply(self.closest_strike_price)
-            self.df['strike_price_diff'] = np.abs(self.df['strike_price'] - self.df['spot'])
+            self.df = self.preprocess(df = self.df,
+                                      source_path = data_source_path,
+                                      use_cache = cache_derived_columns)
         except Exception as e:
             raise KeyError("Something went wrong in class initialisation of Interview Test")
 
+        """
+        The chain index is built once here, it keeps the data sorted by day, expiry, option type
+        and strike so self.df points at the sorted copy instead of holding the data twice
+        """
+        try:
+            self.chain_index = OptionChainIndex(df = self.df)
+            self.df = self.chain_index.data
+        except Exception as e:
+            raise KeyError(fr"Something went wrong while building the chain index: {e}")
+
+        """
+        The strike ladders come from the chain index keys so the grid is built without
+        another pass over the data, the strike interval (50 NIFTY, 100 BANKNIFTY) is
+        detected from them instead of being hardcoded
+        """
+        try:
+            self.strike_grid = StrikeGrid(df = pd.DataFrame(list(self.chain_index.offsets.keys()),
+                                                            columns = ['day'] + self.chain_index.key_columns))
+            self.strike_interval = self.strike_grid.interval()
+        except Exception as e:
+            raise KeyError(fr"Something went wrong while building the strike grid: {e}")
+
+        """
+        All the objectives sell premium so they share one short side engine
+        """
+        self.engine = BacktestEngine(side = -1)
+
+        """
+        The per day outputs go through a ResultWriter, see result_writer()
+        """
+        self.output_format = output_format
+        self.output_compression = output_compression
+        self.output_flush_rows = output_flush_rows
+
+        """
+        Optionally replaces the fixed sigma with the implied volatility of every row,
+        the rows which did not converge are kept in iv_failed_rows for inspection
+        """
+        self.iv_failed_rows = None
+        if compute_implied_volatility:
+            self.add_implied_volatility()
+
+    """
+    Per day outputs are handed to a background writer which batches them into one
+    partitioned parquet dataset (or arrow stream) under output_dir instead of one csv
+    per day, output_format = 'csv' keeps the old one file per day layout
+    """
+    def result_writer(self, output_dir = None):
+        return ResultWriter(root_path = output_dir,
+                            output_format = self.output_format,
+                            compression = self.output_compression,
+                            flush_rows = self.output_flush_rows)
+
+    """
+    Same test restricted to one day, the data is a slice of the chain index and everything
+    else (index, strike grid, engine) is shared instead of being built again
+    """
+    def dayView(self, day = None):
+        view = copy.copy(self)
+        view.df = self.chain_index.getDay(day)
+        return view
+
+    def add_implied_volatility(self,
+                               premium_column = 'close',
+                               rate_of_interest = 7/100):
+        try:
+            self.df, self.iv_failed_rows = self.impliedVolatilityColumn(df = self.df,
+                                                                        premium_column = premium_column,
+                                                                        rate_of_interest = rate_of_interest)
+        except Exception as e:
+            raise ValueError(fr"Error in calling impliedVolatilityColumn() from add_implied_volatility(): {e}")
+
+        if not self.iv_failed_rows.empty:
+            print(fr"Implied volatility did not converge for {len(self.iv_failed_rows)} rows")
+        return self.iv_failed_rows
+
     def objective_one(self, 
                       start_trade_time = pd.to_datetime('09:30:00').time(),
                       end_trade_time = pd.to_datetime('15:15:00').time(),
@@ -371,10 +586,8 @@ class InterviewTest(ObjTwoFormulas,
                 columns_to_drop = ['expiry', 'time_to_maturity', 'strike_price_diff', 
                                 'date', 'close', 'nearest_atm']
                 calls_data.drop(columns=columns_to_drop, 
-                                axis=1, 
                                 inplace=True)
                 puts_data.drop(columns=columns_to_drop, 
-                            axis=1, 
                             inplace=True)
             except Exception as e:
                 raise KeyError(fr"Error in dropping columns: {e}")
@@ -386,7 +599,6 @@ class InterviewTest(ObjTwoFormulas,
                 merged_df_columns_dropped = ['symbol_x', 'option_type_x', 'strike_price_x', 'spot_x', 
                                             'symbol_y', 'option_type_y', 'strike_price_y', 'spot_y']
                 merged_df.drop(columns = merged_df_columns_dropped,
-                                        axis = 1, 
                                         inplace = True)
             except Exception as e:
                 raise ValueError(fr"Error in merging calls_data and puts_data: {e}")
@@ -397,40 +609,14 @@ class InterviewTest(ObjTwoFormulas,
             objective_one_data.append(data)
         
 
-        output_dir = str(f"{os.getcwd()}/objective_one_output")
-
-        os.makedirs(
-                    output_dir,
-                    exist_ok = True
-                )
-
-        for item in objective_one_data:
-            for key, value in item.items():
-                file_path = os.path.join(
-                                        output_dir, 
-                                        f"{key[0:10]}.csv"
-                                        )
-                value.to_csv(
-                            file_path, 
-                            index = False
-                            )    
         try:
             output_dir = str(f"{os.getcwd()}/objective_one_output")
-            os.makedirs(
-                        output_dir,
-                        exist_ok = True
-                    )
             try:
-                for item in objective_one_data:
-                    for key, value in item.items():
-                        file_path = os.path.join(
-                                                output_dir, 
-                                                f"{key[0:10]}.csv"
-                                                )
-                        value.to_csv(
-                                    file_path, 
-                                    index = False
-                                    )    
+                with self.result_writer(output_dir = output_dir) as writer:
+                    for item in objective_one_data:
+                        for key, value in item.items():
+                            writer.write(key = key[0:10],
+                                         df = value)
             except KeyError as e:
                 print(f"Error occurred in objective_one_output: {e}")  
             except Exception as e:
@@ -441,10 +627,12 @@ class InterviewTest(ObjTwoFormulas,
         except Exception as e:
             print(f"Error occurred in objective_one_output: {e}")  
         
+        return objective_one_data
     
     def objective_two(self,
                       start_trade_time = pd.to_datetime("09:30:00").time(),
-                      end_trade_time = pd.to_datetime("15:15:00").time()
+                      end_trade_time = pd.to_datetime("15:15:00").time(),
+                      write_summary = True
                       ):
         """
         I have grouped into days first then over the time in each day group,
@@ -454,7 +642,7 @@ class InterviewTest(ObjTwoFormulas,
         """
         
         try:
-            grouped = self.group_df_daily(data = self.df.copy(deep = True))
+            grouped = self.group_df_daily(data = self.df)
         except Exception as e:
             print(fr"Exception Error: {e}")
             raise ValueError("Empty grouped obj in objective three")
@@ -475,7 +663,8 @@ class InterviewTest(ObjTwoFormulas,
                 continue
 
             nearest_expiry = daily_spot_data['expiry'].min()
-            nearest_strike_price = daily_spot_data.iloc[0]['nearest_atm']
+            # the day's rows are in chain order, the atm is taken from its first minute
+            nearest_strike_price = daily_spot_data.loc[daily_spot_data['datetime'].idxmin(), 'nearest_atm']
 
             kwargs = {
                     'grouped_data': daily_spot_data,
@@ -484,6 +673,7 @@ class InterviewTest(ObjTwoFormulas,
                     'nearest_strike_price': nearest_strike_price,
                     'start_trade_time': start_trade_time,
                     'end_trade_time': end_trade_time,
+                    'chain_index': self.chain_index,
                 }
             
             try:
@@ -491,84 +681,70 @@ class InterviewTest(ObjTwoFormulas,
             except Exception as e:
                 print(fr"Error in calling find_nearest_expiry_and_strike_min_obj_two into objective_two")
             
-            max_pnl = 0.0
-            entry_straddle_premium = 0.0
-            pnl = 0.0
-            max_loss = 0.0
-            min_pnl = 0.0
+            """
+            The call and put legs are lined up once and the short straddle is run through the
+            backtest engine on whole arrays, it is sold at start_trade_time and bought back at
+            end_trade_time
+            """
+            (call_data, put_data), matched = self.engine.alignLegs(legs = [call_data, put_data],
+                                                                   match_columns = ('datetime', 'spot', 'strike_price', 'expiry'))
+            if not matched.all():
+                raise ValueError("Mismatch in call and put row datetime")
 
-            df = None
-            df_list = []
-
-            for call_row, put_row in zip(call_data.itertuples(), put_data.itertuples()):
-                if ((call_row.datetime == put_row.datetime) and (call_row.spot == put_row.spot) and (call_row.strike_price == put_row.strike_price) and (call_row.expiry == put_row.expiry)):
-                    curr_time = call_row.datetime.time() or put_row.datetime.time()
-                    curr_datetime = call_row.datetime or put_row.datetime
-                    call_premium = float(call_row.close)
-                    put_premium = float(put_row.close) 
-                    spot = float(call_row.spot) or float(put_row.spot)
-                    try:
-                        straddle_price = self.compute_straddle_price(call_price = call_premium ,
-                                                                    put_price = put_premium)
-                    except Exception as e:
-                        print(fr"Error in calling compute_straddle_price into objective_two function {e}")
-                    
-                    if (curr_time == pd.to_datetime("9:30:00").time()):
-                        final_pnl = 0
-                        trade_entry_strike = int(nearest_strike_price)
-                        entry_straddle_premium = float(straddle_price)
-
-                        max_pnl = float(entry_straddle_premium-0)
-                        max_loss = float(nearest_strike_price - 0)
-                        min_pnl = float(entry_straddle_premium - max_loss)
-                        entry, net_position, exit = -1, 0, 0
-                        
-                    elif (pd.to_datetime("9:30:00").time() < curr_time < pd.to_datetime("15:15:00").time()):
-                        final_pnl = float(entry_straddle_premium - straddle_price)
-                        net_position = -1
-                        entry = 0
-                        exit = 0
-                    elif (curr_time == pd.to_datetime("15:15:00").time()):
-                        exit, net_position = 1, 0
-                        final_pnl = float(entry_straddle_premium - straddle_price)
-                        # analysis
-                        dt = date.strftime('%Y-%m-%d %H:%M:%S')
-                        summary_of_trading_day = {
-                            str(dt[0:10]): {
-                                'entry_straddle_premium': entry_straddle_premium,
-                                'exit_premium': straddle_price,
-                                'exit_pnl': final_pnl
-                                }
-                        }
-                        objective_two_analysis.append(summary_of_trading_day)
+            call_premium = call_data['close'].astype(float)
+            put_premium = put_data['close'].astype(float)
+            try:
+                straddle_price = self.compute_straddle_price(call_price = call_premium,
+                                                             put_price = put_premium)
+            except Exception as e:
+                print(fr"Error in calling compute_straddle_price into objective_two function {e}")
 
-                else:
-                    raise ValueError("Mismatch in call and put row datetime")
-                
-                mtm = float(entry_straddle_premium - straddle_price)
-        
-                data_per_min = {
-                    'datetime': curr_datetime,
-                    'entry_strike': trade_entry_strike,
-                    'time': curr_time,
-                    'spot': spot,
-                    'entry_straddle_premium': entry_straddle_premium,
-                    'call_premium': call_premium,
-                    'put_premium': put_premium,
-                    'straddle_price': straddle_price,
-                    'mtm': mtm,
-                    'max_pnl': max_pnl,
-                    'min_pnl': min_pnl,
-                    'max_loss': max_loss,
-                    'entry': entry,
-                    'exit': exit,
-                    'net_position': net_position,
+            df = pd.DataFrame({
+                'datetime': call_data['datetime'],
+                'straddle_price': straddle_price,
+            })
+            time_of_day = self.timeOfDayValues(call_data)
+            positions = self.engine.run(frame = df,
+                                        premium_column = 'straddle_price',
+                                        entry_rule = (time_of_day == self.timeToNanoseconds(start_trade_time)),
+                                        session_end_rule = (time_of_day == self.timeToNanoseconds(end_trade_time)))
+
+            entry_rows = positions['entry'] != 0
+            entry_straddle_premium = float(straddle_price[entry_rows].iloc[0]) if entry_rows.any() else 0.0
+            max_pnl = float(entry_straddle_premium - 0)
+            max_loss = float(nearest_strike_price - 0)
+            min_pnl = float(entry_straddle_premium - max_loss)
+
+            df = pd.DataFrame({
+                'datetime': call_data['datetime'],
+                'entry_strike': int(nearest_strike_price),
+                'time': call_data['datetime'].dt.time,
+                'spot': call_data['spot'].astype(float),
+                'entry_straddle_premium': entry_straddle_premium,
+                'call_premium': call_premium,
+                'put_premium': put_premium,
+                'straddle_price': straddle_price,
+                'mtm': entry_straddle_premium - straddle_price,
+                'max_pnl': max_pnl,
+                'min_pnl': min_pnl,
+                'max_loss': max_loss,
+                'entry': positions['entry'],
+                'exit': positions['exit'],
+                'net_position': positions['net_position'],
+            }).sort_values(by = 'datetime').reset_index(drop = True)
+
+            # analysis
+            dt = date.strftime('%Y-%m-%d %H:%M:%S')
+            for exit_premium in straddle_price[positions['exit'] == 1]:
+                summary_of_trading_day = {
+                    str(dt[0:10]): {
+                        'entry_straddle_premium': entry_straddle_premium,
+                        'exit_premium': float(exit_premium),
+                        'exit_pnl': float(entry_straddle_premium - exit_premium)
+                        }
                 }
+                objective_two_analysis.append(summary_of_trading_day)
 
-                df_list.append(data_per_min)
-            
-            df = pd.DataFrame(df_list).sort_values(by = 'datetime').reset_index(drop = True)
-        
             objective_two.append({
                 str(dt): df
             })
@@ -578,15 +754,12 @@ class InterviewTest(ObjTwoFormulas,
 
         try:
             output_dir = str(f"{os.getcwd()}/objective_two_output/data")
-            os.makedirs(output_dir,
-                        exist_ok = True)
             try:
-                for item in objective_two:
-                    for key, value in item.items():
-                        file_path = os.path.join(output_dir, 
-                                                f"{key[0:10]}.csv")
-                        value.to_csv(file_path, 
-                                    index = False)  
+                with self.result_writer(output_dir = output_dir) as writer:
+                    for item in objective_two:
+                        for key, value in item.items():
+                            writer.write(key = key[0:10],
+                                         df = value)
             except KeyError as e:
                 print(f"Error occurred in objective_two_output: {e}")  
             except Exception as e:
@@ -598,6 +771,18 @@ class InterviewTest(ObjTwoFormulas,
             print(f"Error occurred in objective_two_output: {e}")  
         
         
+        if write_summary:
+            self.write_objective_two_analysis(objective_two_analysis)
+
+        return (objective_two, objective_two_analysis)
+        
+        
+    """
+    Writes the per day exit summary of objective_two, kept apart so the day shards can be
+    merged first and written once
+    """
+    @staticmethod
+    def write_objective_two_analysis(objective_two_analysis = None):
         try:
             output_dir = str(f"{os.getcwd()}/objective_two_output/pnl_analysis")
             os.makedirs(output_dir,
@@ -619,18 +804,15 @@ class InterviewTest(ObjTwoFormulas,
         except IOError as e:
             print(f"File I/O operations error {e} in objective_two_output")
         except Exception as e:
-            print(f"Error occurred in objective_two_output: {e}")  
-            
+            print(f"Error occurred in objective_two_output: {e}")
 
-        return (objective_two, objective_two_analysis)
-        
-        
     def objective_three(self,
                         window_period = 30,
-                        start_trade_time = pd.to_datetime("09:16:00").time()):
+                        start_trade_time = pd.to_datetime("09:16:00").time(),
+                        interval = None):
         
         try:
-            grouped = self.group_df_daily(data = self.df.copy(deep = True))
+            grouped = self.group_df_daily(data = self.df)
         except Exception as e:
             print(fr"Exception Error: {e}")
             raise ValueError("Empty grouped obj in objective three")
@@ -643,39 +825,38 @@ class InterviewTest(ObjTwoFormulas,
             
             try:
                 atm_data, low_otm_data, up_otm_data = self.slice_otms_obj_three(df = daily_spot_data, 
-                                                                        start_trade_time = start_trade_time)
+                                                                        start_trade_time = start_trade_time,
+                                                                        chain_index = self.chain_index,
+                                                                        interval = interval)
             except Exception as e:
                 print("Error in calling slice_otms_obj_three in objective_three")
                 raise ModuleNotFoundError("Cannot call slice_otms_obj_three() function")
             
-            for atm, lotm, uotm in zip(atm_data.itertuples(), low_otm_data.itertuples(), up_otm_data.itertuples()):
-                if ((atm.datetime == lotm.datetime == uotm.datetime) and (lotm.spot == atm.spot == uotm.spot) and (uotm.strike_price != lotm.strike_price != atm.strike_price) and (lotm.expiry == uotm.expiry == atm.expiry)):
-                    curr_time = atm.datetime.time() or lotm.datetime.time() or uotm.datetime.time()
-                    curr_datetime = atm.datetime or uotm.datetime or lotm.datetime
-                    lotm_premium = float(lotm.close)
-                    atm_premium = float(atm.close) 
-                    uotm_premium = float(uotm.close) 
-
-                    spot = float(lotm.spot) or float(uotm.spot) or float(atm.spot)
-                    expiry = lotm.expiry or uotm.expiry or atm.expiry
-
-                    data_per_min = {
-                        'index_datetime': curr_datetime,
-                        'datetime': curr_datetime,
-                        'time': curr_time,
-                        'spot': spot,
-                        'OTM1_CE_PREMIUM': lotm_premium,
-                        'OTM1_CE_STRIKE': lotm.strike,
-                        'OTM1_CE_STRIKE': uotm.strike,
-                        'OTM2_CE_PREMIUM': uotm_premium,
-                        'ATM_CE_PREMIUM': atm_premium,
-                        'expiry': expiry
-                    }
-                    objective_three.append(data_per_min)
-                    data_per_min = None
+            """
+            The three legs are lined up row by row and the rows where the legs disagree on
+            time, spot or expiry, or share a strike, are dropped in one pass
+            """
+            (atm_data, low_otm_data, up_otm_data), _ = self.engine.alignLegs(legs = [atm_data, low_otm_data, up_otm_data],
+                                                                             match_columns = ('datetime', 'spot', 'expiry'))
+            distinct_strikes = ((up_otm_data['strike_price'] != low_otm_data['strike_price']) &
+                                (low_otm_data['strike_price'] != atm_data['strike_price']))
+
+            data_per_day = pd.DataFrame({
+                'index_datetime': atm_data['datetime'],
+                'datetime': atm_data['datetime'],
+                'time': atm_data['datetime'].dt.time,
+                'spot': low_otm_data['spot'].astype(float),
+                'OTM1_CE_PREMIUM': low_otm_data['close'].astype(float),
+                'OTM1_CE_STRIKE': low_otm_data['strike_price'],
+                'OTM2_CE_PREMIUM': up_otm_data['close'].astype(float),
+                'OTM2_CE_STRIKE': up_otm_data['strike_price'],
+                'ATM_CE_PREMIUM': atm_data['close'].astype(float),
+                'expiry': low_otm_data['expiry']
+            })
+            objective_three.append(data_per_day[distinct_strikes])
             daily_spot_data = None
 
-        final_obj_three_df = pd.DataFrame(objective_three).sort_values(by = 'datetime').reset_index(drop = True)
+        final_obj_three_df = pd.concat(objective_three).sort_values(by = 'datetime').reset_index(drop = True)
         final_obj_three_df.set_index('index_datetime', inplace = True)
         
         # DMA Calculations based on window given
@@ -683,35 +864,37 @@ class InterviewTest(ObjTwoFormulas,
         final_obj_three_df['OTM1_CE_DMA'] = 0.0 
         final_obj_three_df['OTM2_CE_DMA'] = 0.0 
         final_obj_three_df['Banknifty_RSI'] = 0.0 
-        final_obj_three_df['Banknifty_30_DMA'] = final_obj_three_df['spot'].rolling(window = window_period).mean()
-        final_obj_three_df['OTM1_CE_DMA'] = final_obj_three_df['OTM1_CE_PREMIUM'].rolling(window = window_period).mean()
-        final_obj_three_df['OTM2_CE_DMA'] = final_obj_three_df['OTM2_CE_PREMIUM'].rolling(window = window_period).mean()
+        dma = SimpleMovingAverage(window = window_period)
+        final_obj_three_df['Banknifty_30_DMA'] = dma.batch(final_obj_three_df['spot'])
+        final_obj_three_df['OTM1_CE_DMA'] = dma.batch(final_obj_three_df['OTM1_CE_PREMIUM'])
+        final_obj_three_df['OTM2_CE_DMA'] = dma.batch(final_obj_three_df['OTM2_CE_PREMIUM'])
 
 
         final_obj_three_df['Banknifty_RSI'] = self.calculate_rsi(final_obj_three_df['spot'])
 
-        final_obj_three_df['Banknifty_30_DMA'] = final_obj_three_df['Banknifty_30_DMA'].apply(lambda x: 0 if pd.isna(x) else x)
-        final_obj_three_df['OTM1_CE_DMA'] = final_obj_three_df['OTM1_CE_DMA'].apply(lambda x: 0 if pd.isna(x) else x)
-        final_obj_three_df['OTM2_CE_DMA'] = final_obj_three_df['OTM2_CE_DMA'].apply(lambda x: 0 if pd.isna(x) else x)
-        final_obj_three_df['Banknifty_RSI'] = final_obj_three_df['Banknifty_RSI'].apply(lambda x: 0 if pd.isna(x) else x)
+        final_obj_three_df['Banknifty_30_DMA'] = final_obj_three_df['Banknifty_30_DMA'].fillna(0)
+        final_obj_three_df['OTM1_CE_DMA'] = final_obj_three_df['OTM1_CE_DMA'].fillna(0)
+        final_obj_three_df['OTM2_CE_DMA'] = final_obj_three_df['OTM2_CE_DMA'].fillna(0)
+        final_obj_three_df['Banknifty_RSI'] = final_obj_three_df['Banknifty_RSI'].fillna(0)
 
         final_obj_three_df.sort_values(by = 'datetime')
         df_grouped = final_obj_three_df.groupby(pd.Grouper(key = 'datetime',
                                                    freq = 'D'))
         df_dict = {str(key.strftime('%Y-%m-%d %H:%M:%S')[0:10]): value for key, value in df_grouped}
         output_dir = str(f"{os.getcwd()}/objective_three_output")
-        os.makedirs(output_dir,
-                    exist_ok = True)
-        for key, value in df_dict.items():
-            file_path = os.path.join(output_dir, 
-                                    f"{key[0:10]}.csv")
-            value.to_csv(file_path, 
-                        index = False)    
+        with self.result_writer(output_dir = output_dir) as writer:
+            for key, value in df_dict.items():
+                writer.write(key = key[0:10],
+                             df = value)
+
+        return df_dict
         
     def objective_four(self,
                        window_period = 30,
                        start_trade_time = pd.to_datetime("09:30:00").time(),
                        end_trade_time = pd.to_datetime("15:15:00").time(),
+                       write_summary = True,
+                       straddle_multiplier = 1.5
                        ):
         
 
@@ -722,7 +905,7 @@ class InterviewTest(ObjTwoFormulas,
         are default values which can be changed according to the users needs
         """
         try:
-            grouped = self.group_df_daily(data = self.df.copy(deep = True))
+            grouped = self.group_df_daily(data = self.df)
 
         except Exception as e:
             print(fr"Exception Error: {e}")
@@ -741,7 +924,9 @@ class InterviewTest(ObjTwoFormulas,
             
             kwargs = {
                 'data': data,
-                'start_trade_time': start_trade_time
+                'start_trade_time': start_trade_time,
+                'chain_index': self.chain_index,
+                'straddle_multiplier': straddle_multiplier,
             }
             
             try:
@@ -750,78 +935,50 @@ class InterviewTest(ObjTwoFormulas,
                 print("Error occured in objective_four()")
                 raise ModuleNotFoundError("Error occured while calling filter_df_obj_four()")
 
-            for (call_row, put_row) in zip(call_data.itertuples(), put_data.itertuples()):
-                if ((call_row.datetime == put_row.datetime) and (call_row.spot == put_row.spot) and (put_row.strike_price == put_strike) and (call_row.strike_price == call_strike) and (call_row.expiry == put_row.expiry)):
-                    curr_time = call_row.datetime.time() or put_row.datetime.time()
-                    curr_datetime = call_row.datetime or put_row.datetime
-                    call_premium = float(call_row.close)
-                    put_premium = float(put_row.close) 
-                    curr_call_strike = int(call_row.strike_price)
-                    curr_put_strike = int(put_row.strike_price)
-                    spot = float(call_row.spot) or float(put_row.spot)
-                    strangle_premium = float(call_premium + put_premium)
-                    expiry = call_row.expiry or put_row.expiry
-            
-                    data_per_min = {
-                        'datetime': curr_datetime,
-                        'time': curr_time,
-                        'spot': spot,
-                        'expiry': expiry,
-                        'ce_strike_price': curr_call_strike,
-                        'pe_strike_price': curr_put_strike,
-                        'call_premium': call_premium,
-                        'put_premium': put_premium,
-                        'strangle_premium': strangle_premium,
-                    }
-
-                    objective_four_data.append(data_per_min)
-                data_per_min = None
+            (call_data, put_data), _ = self.engine.alignLegs(legs = [call_data, put_data],
+                                                             match_columns = ('datetime', 'spot', 'expiry'))
+            selected_strikes = ((put_data['strike_price'] == put_strike) &
+                                (call_data['strike_price'] == call_strike))
+
+            call_premium = call_data['close'].astype(float)
+            put_premium = put_data['close'].astype(float)
+            data_per_day = pd.DataFrame({
+                'datetime': call_data['datetime'],
+                'time': call_data['datetime'].dt.time,
+                'spot': call_data['spot'].astype(float),
+                'expiry': call_data['expiry'],
+                'ce_strike_price': call_data['strike_price'].astype(int),
+                'pe_strike_price': put_data['strike_price'].astype(int),
+                'call_premium': call_premium,
+                'put_premium': put_premium,
+                'strangle_premium': call_premium + put_premium,
+            })
+            objective_four_data.append(data_per_day[selected_strikes])
             data = None
         
-        final_obj_four_df = pd.DataFrame(objective_four_data).sort_values(by = 'datetime').reset_index(drop = True)
-        final_obj_four_df['strangle_premium_dma'] = final_obj_four_df['strangle_premium'].rolling(window = int(window_period)).mean().apply(lambda x: 0 if pd.isna(x) else x)
+        final_obj_four_df = pd.concat(objective_four_data).sort_values(by = 'datetime').reset_index(drop = True)
+        final_obj_four_df['strangle_premium_dma'] = np.nan_to_num(SimpleMovingAverage(window = int(window_period)).batch(final_obj_four_df['strangle_premium']), nan = 0.0)
  
-        final_obj_four_df['entry'] = 0.0
-        final_obj_four_df['net_position'] = 0.0
-        final_obj_four_df['exit'] = 0.0
-        final_obj_four_df['max_pnl'] = 0.0
+        """
+        The position is run through the backtest engine instead of walking the rows, inside
+        the trading window the strangle is sold when its premium drops below the DMA, bought
+        back when it rises above it and always closed at end_trade_time
+        """
+        current_time = self.timeOfDay(final_obj_four_df['datetime'])
+        positions = self.engine.run(frame = final_obj_four_df,
+                                    premium_column = 'strangle_premium',
+                                    entry_rule = final_obj_four_df['strangle_premium'] < final_obj_four_df['strangle_premium_dma'],
+                                    exit_rule = final_obj_four_df['strangle_premium'] > final_obj_four_df['strangle_premium_dma'],
+                                    session_end_rule = (current_time == self.timeToNanoseconds(end_trade_time)),
+                                    tradable_rule = self.timeWindowMask(data = final_obj_four_df, start = start_trade_time, end = end_trade_time))
+
+        final_obj_four_df['entry'] = positions['entry'].astype(float)
+        final_obj_four_df['net_position'] = positions['net_position'].astype(float)
+        final_obj_four_df['exit'] = positions['exit'].astype(float)
+        final_obj_four_df['max_pnl'] = positions['entry_premium']
         final_obj_four_df['mtm'] = 0.0
         final_obj_four_df['pnl'] = 0.0
 
-        in_position = False
-
-        for i in range(len(final_obj_four_df)):
-            try:
-                current_time = final_obj_four_df.at[i, 'datetime'].time()
-                if start_trade_time <= current_time <= end_trade_time:
-                    if current_time == end_trade_time:
-                        if in_position:
-                            final_obj_four_df.at[i, 'exit'] = 1
-                            final_obj_four_df.at[i, 'net_position'] = 0
-                            in_position = False
-                            final_obj_four_df.at[i,'max_pnl'] = entry_premium
-                            entry_premium = 0
-                        continue
-
-                    elif not in_position and final_obj_four_df.at[i, 'strangle_premium'] < final_obj_four_df.at[i, 'strangle_premium_dma']:
-                        final_obj_four_df.at[i, 'entry'] = -1
-                        final_obj_four_df.at[i, 'net_position'] = 0
-                        in_position = True
-                        entry_premium = final_obj_four_df.at[i, 'strangle_premium']
-                        final_obj_four_df.at[i, 'max_pnl'] = entry_premium
-                        final_obj_four_df.at[i, 'mtm'] = 0
-                    elif in_position and final_obj_four_df.at[i, 'strangle_premium'] > final_obj_four_df.at[i, 'strangle_premium_dma']:
-                        final_obj_four_df.at[i, 'exit'] = 1
-                        final_obj_four_df.at[i, 'net_position'] = 0
-                        final_obj_four_df.at[i, 'max_pnl'] = entry_premium
-                        entry_premium = 0
-                        in_position = False
-                    elif in_position:
-                        final_obj_four_df.at[i, 'net_position'] = -1
-                        final_obj_four_df.at[i,'max_pnl'] = entry_premium
-            except IndexError as e:
-                raise IndexError(fr"Index error in final for loop in objective_four: {e}")
-
 
         """
         Using vectorisation to slice the data and applying a mask to get the 
@@ -858,17 +1015,23 @@ class InterviewTest(ObjTwoFormulas,
 
         try:
             output_dir = str(f"{os.getcwd()}/objective_four_output/data")
-            os.makedirs(output_dir,
-                    exist_ok = True)
-       
-            for key, value in df_dict.items():
-                file_path = os.path.join(output_dir, 
-                                        f"{key[0:10]}.csv")
-                value.to_csv(file_path, 
-                            index = False)
+            with self.result_writer(output_dir = output_dir) as writer:
+                for key, value in df_dict.items():
+                    writer.write(key = key[0:10],
+                                 df = value)
         except Exception as e:
             print(f"Error in creating data files for objective_four(): {e}")
         
+        if write_summary:
+            self.write_objective_four_analysis(df_dict_analysis)
+
+        return (df_dict, df_dict_analysis)
+
+    """
+    Writes the total pnl of every day of objective_four into one file
+    """
+    @staticmethod
+    def write_objective_four_analysis(df_dict_analysis = None):
         try:
             output_dir = str(f"{os.getcwd()}/objective_four_output/pnl_analysis")
             os.makedirs(output_dir,
@@ -885,25 +1048,92 @@ class InterviewTest(ObjTwoFormulas,
             print(f"Error in creating df_dict_analysis_df files for objective_four(): {e}")
 
 
-def execute_objective(method):
-    file_path = "/Users/siddhanthmate/Desktop/AllFiles/Interview/calculations/combined_data_BN.feather"
-    it = InterviewTest(feather_file_path = file_path)
-    method(it)
+FEATHER_FILE_PATH = "/Users/siddhanthmate/Desktop/AllFiles/Interview/calculations/combined_data_BN.feather"
+
+"""
+Built once per worker process by ShardedObjective.initialiseWorker over the shared memory
+mapped file, every day shard the worker runs is a view of it
+"""
+_worker_test = None
+
+
+"""
+Runs one objective on a single day shard handed over by DayShardedExecutor and writes that
+day's files. The objectives with an all days summary return their part of it and merge()
+writes it once in day order. Only the objectives without state across days can be sharded,
+objective_three's moving average and RSI and objective_four's moving average and open
+position carry over from the previous days.
+"""
+class ShardedObjective:
+    summary_writers = {
+        'objective_two': 'write_objective_two_analysis',
+    }
+    day_independent = ('objective_one', 'objective_two')
+
+    def __init__(self, objective_name = None, output_format = 'parquet', **objective_kwargs):
+        if objective_name not in self.day_independent:
+            raise ValueError(fr"{objective_name} cannot be run per day, has to be one of {self.day_independent}")
+        self.objective_name = objective_name
+        self.output_format = output_format
+        self.objective_kwargs = objective_kwargs
+
+    def initialiseWorker(self, file_path = None):
+        global _worker_test
+        _worker_test = InterviewTest(feather_file_path = file_path,
+                                     memory_map = True,
+                                     output_format = self.output_format)
+
+    def __call__(self, day, day_df = None):
+        objective = getattr(_worker_test.dayView(day = day), self.objective_name)
+        if self.objective_name not in self.summary_writers:
+            objective(**self.objective_kwargs)
+            return None
+        _, summary = objective(write_summary = False, **self.objective_kwargs)
+        return summary
+
+    def merge(self, day_results = None):
+        if self.objective_name not in self.summary_writers:
+            return None
+        summary = [item for _, day_summary in day_results for item in day_summary]
+        getattr(InterviewTest, self.summary_writers[self.objective_name])(summary)
+        return summary
+
 
 def main():
     """
-    Running this in thread to speed up the process
+    The day independent objectives are sharded by trading day across all the cores, three
+    and four run over all the days in order since their indicators and positions carry
+    from one day to the next. A failed shard or objective stops the run.
     """
-    cpu_count = round(int(os.cpu_count())/2)
-    objectives = [
-        InterviewTest.objective_one,
-        InterviewTest.objective_two,
-        InterviewTest.objective_three,
-        InterviewTest.objective_four
+    sharded_objectives = [
+        'objective_one',
+        'objective_two',
+    ]
+    serial_objectives = [
+        'objective_three',
+        'objective_four',
     ]
     
-    with ProcessPoolExecutor(max_workers = cpu_count) as executor:
-        executor.map(execute_objective, objectives)
+    """
+    The shared uncompressed copy is written once here, already in chain index order,
+    so every day is one block of rows which the workers map and slice without copying.
+    The serial test maps the same copy and writes its derived column cache before the
+    workers start, so they only read it.
+    """
+    executor = DayShardedExecutor(file_path = FEATHER_FILE_PATH,
+                                  prepare_function = OptionChainIndex.sortedFrame)
+    it = InterviewTest(feather_file_path = FEATHER_FILE_PATH,
+                       memory_map = True)
+
+    for objective_name in sharded_objectives:
+        sharded_objective = ShardedObjective(objective_name = objective_name)
+        executor.run(strategy = sharded_objective,
+                     merge_function = sharded_objective.merge,
+                     worker_initializer = sharded_objective.initialiseWorker,
+                     shard_frames = False)
+
+    for objective_name in serial_objectives:
+        getattr(it, objective_name)()
 
 
 if __name__ == "__main__":
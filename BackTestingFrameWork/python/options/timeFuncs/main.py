@@ -1,10 +1,52 @@
 from datetime import datetime
+import numpy as np
+import pandas as pd
 
 
 class OptionsTimeFunctions:
+    """
+    Loaders precompute time_of_day_ns (nanoseconds since midnight, int64) so the time
+    filters compare integers instead of building a datetime.time object per row
+    """
+    time_of_day_column = 'time_of_day_ns'
+
     def __init__(self) -> None:
         pass
 
+    def timeOfDay(self, datetimes = None):
+        values = pd.to_datetime(datetimes).to_numpy(dtype = 'datetime64[ns]')
+        return (values - values.astype('datetime64[D]')).astype(np.int64)
+
+    """
+    Nanoseconds since midnight of a datetime.time, datetime/Timestamp or 'HH:MM:SS' string
+    """
+    def timeToNanoseconds(self, value = None):
+        if isinstance(value, str):
+            value = pd.to_datetime(value).time()
+        return (((value.hour*60 + value.minute)*60 + value.second)*1000000 + value.microsecond)*1000
+
+    """
+    Time of day of every row, the precomputed column when the loader added it
+    """
+    def timeOfDayValues(self, data = None):
+        if self.time_of_day_column in data.columns:
+            return data[self.time_of_day_column].to_numpy()
+        return self.timeOfDay(data['datetime'])
+
+    def timeWindowMask(self, data = None, start = None, end = None):
+        time_of_day = self.timeOfDayValues(data)
+        return (time_of_day >= self.timeToNanoseconds(start)) & (time_of_day <= self.timeToNanoseconds(end))
+
+    """
+    For data sorted by datetime within one day (e.g. one leg from the chain index) the
+    window is found with two binary searches and returned as a slice without a mask
+    """
+    def timeWindowSlice(self, data = None, start = None, end = None):
+        time_of_day = self.timeOfDayValues(data)
+        first = np.searchsorted(time_of_day, self.timeToNanoseconds(start), side = 'left')
+        last = np.searchsorted(time_of_day, self.timeToNanoseconds(end), side = 'right')
+        return data.iloc[first:last]
+
     """
     This function is made to trim the timestamp in the expiry 
     such that that the option expires on that day at 15:30:00Hrs
@@ -23,5 +65,4 @@ class OptionsTimeFunctions:
         if not any([start,end,data]):
             raise ValueError("Empty parameters passed to the apply_time_mask function")
         
-        mask = ((data['datetime'].dt.time >= start) & (data['datetime'].dt.time <= end))
-        return data[mask]
\ No newline at end of file
+        return data[self.timeWindowMask(data = data, start = start, end = end)]
\ No newline at end of file
@@ -35,6 +35,12 @@ from requests.exceptions import *
 from urllib3.exceptions import *
 from concurrent.futures import ThreadPoolExecutor
 
+from tick_queue.main import TickQueue
+from persistence_writer.main import PersistenceWriter
+from dispatcher.main import instrument_id
+from tick_envelope.main import decode
+from live_indicators.main import LiveIndicators
+
 
 class LowLatencyDataBase:
     def __init__(self, 
@@ -42,13 +48,53 @@ class LowLatencyDataBase:
                  redis_port=6379, 
                  redis_db=0, 
                  mongo_uri='mongodb://localhost:27017/', 
-                 mongo_db_name='XTS_MARKET_DATA_WEBSOC'
+                 mongo_db_name='XTS_MARKET_DATA_WEBSOC',
+                 queue_size=10000,
+                 overflow_policy='block',
+                 publish_batch_size=500,
+                 publish_max_wait=0.001,
+                 publish_max_retries=3,
+                 publish_retry_backoff=0.05,
+                 persist_batch_size=1000,
+                 persist_interval=0.5,
+                 spill_dir=None,
+                 raw_forwarding=False,
+                 indicator_window=None,
+                 indicator_channel='1501-json-full'
                  ):
         self.redis_host = redis_host
         self.redis_port = redis_port
         self.redis_db = redis_db
         self.mongo_uri = mongo_uri
         self.mongo_db_name = mongo_db_name
+        # bound and overflow policy (block, drop_oldest, conflate) of the per channel tick queues
+        self.queue_size = queue_size
+        self.overflow_policy = overflow_policy
+        # a publisher sends up to publish_batch_size ticks, or what arrived within
+        # publish_max_wait seconds of the first one, in one redis pipeline
+        self.publish_batch_size = publish_batch_size
+        self.publish_max_wait = publish_max_wait
+        # a failed pipeline is retried publish_max_retries times, the wait doubling from
+        # publish_retry_backoff seconds, before its batch is counted as lost
+        self.publish_max_retries = publish_max_retries
+        self.publish_retry_backoff = publish_retry_backoff
+        self.publish_stats = {}
+        # ticks are stored in batches per channel, spilled to spill_dir when mongo is down
+        self.persist_batch_size = persist_batch_size
+        self.persist_interval = persist_interval
+        self.spill_dir = spill_dir
+        self.persistence_writers = {}
+        self.listen_errors = {}
+        # the ticks go to redis as a tick envelope (receive time header + the payload as it
+        # came off the socket) instead of being parsed and dumped again as JSON, only the
+        # listeners parse them. Off by default, other subscribers of the channels expect JSON.
+        self.raw_forwarding = raw_forwarding
+        # with an indicator_window the backtest dma and rsi run on the one minute closes of
+        # indicator_channel (touchline) as the ticks are published
+        self.indicator_window = indicator_window
+        self.indicator_channel = indicator_channel
+        self.live_indicators = None
+        self.indicator_thread = None
         self.executor = ThreadPoolExecutor(max_workers = 10)  
         self.shutdown_flag = False
 
@@ -77,15 +123,18 @@ class LowLatencyDataBase:
                 '1105-json-full': self.mongo_db["1105-json-full"],
             }
             self.info("Collections for the Database for Channels Initialised")
-            self.data_deques = {
-                '1501-json-full': deque(),
-                '1502-json-full': deque(),
-                '1505-json-full': deque(),
-                '1512-json-full': deque(),
-                '1510-json-full': deque(),
-                '1105-json-full': deque(),
+            self.data_queues = {
+                key: TickQueue(maxsize = self.queue_size,
+                               policy = self.overflow_policy,
+                               key_function = instrument_id)
+                for key in ['1501-json-full',
+                            '1502-json-full',
+                            '1505-json-full',
+                            '1512-json-full',
+                            '1510-json-full',
+                            '1105-json-full']
             }
-            self.info("Deque for Channels Initialised")
+            self.info(fr"Queues for Channels Initialised | size: {self.queue_size} | overflow policy: {self.overflow_policy}")
             self.event_handles = [
                 '1501-json-full',
                 '1502-json-full',
@@ -99,7 +148,7 @@ class LowLatencyDataBase:
             print(fr"Initiating Deque and Handles error: {e}")
 
         self.threads_deques = {}
-        for key, value in self.data_deques.items():
+        for key, value in self.data_queues.items():
             try:
                 thread = threading.Thread(target = self.process_data, 
                                         args =(key,))
@@ -122,24 +171,137 @@ class LowLatencyDataBase:
             except Exception as e:
                 print(fr"threaded processes for event handles went wrong | error: {e}")
 
+        if self.indicator_window:
+            self.live_indicators = LiveIndicators(window = self.indicator_window,
+                                                  logger = self)
+            self.indicator_thread = threading.Thread(target = self.listen_indicators)
+            self.indicator_thread.start()
+            self.info(fr"Starting the live indicators on {self.indicator_channel} | window: {self.indicator_window}")
+
+    def listen_indicators(self):
+        redis_client = redis.Redis(host = self.redis_host,
+                                   port = self.redis_port,
+                                   db = self.redis_db,
+                                   connection_pool = self.pool)
+        pubsub = redis_client.pubsub()
+        pubsub.subscribe(self.indicator_channel)
+        self.live_indicators.listen(pubsub = pubsub,
+                                    stop = lambda: self.shutdown_flag)
+
+    def indicator_metrics(self):
+        if self.live_indicators is None:
+            return None
+        return self.live_indicators.metrics()
+
     def process_data(self, key):
         redis_client = redis.Redis(host = self.redis_host, 
                                     port = self.redis_port, 
                                     db = self.redis_db, 
                                     connection_pool = self.pool)
         
-        while True:            
-            if self.data_deques[key]:
-                data = self.data_deques[key].popleft()
-                time_string = datetime.now().strftime("%H:%M:%S.%f")[:-1]
-                data = json.loads(data)
-                message = json.dumps({"time": time_string, "data": data})
+        stats = self.publish_stats[key] = {'batches': 0,
+                                           'messages': 0,
+                                           'batch_size_max': 0,
+                                           'latency_total': 0.0,
+                                           'latency_max': 0.0,
+                                           'failed_batches': 0,
+                                           'retries': 0,
+                                           'lost_messages': 0}
+
+        while True:
+            # sleeps until a tick arrives, an empty batch once the queue is closed and drained
+            batch = self.data_queues[key].get_batch(max_items = self.publish_batch_size,
+                                                    max_wait = self.publish_max_wait)
+            if not batch:
+                return
+
+            if self.raw_forwarding:
+                # the queued ticks already are envelopes, they are published untouched
+                messages = batch
+            else:
+                messages = []
+                for data in batch:
+                    time_string = datetime.now().strftime("%H:%M:%S.%f")[:-1]
+                    data = json.loads(data)
+                    messages.append(json.dumps({"time": time_string, "data": data}))
+
+            # the batch is kept until it is published, the next one is only taken after
+            # success or once the retries are used up
+            backoff = self.publish_retry_backoff
+            published = False
+            for attempt in range(1, self.publish_max_retries + 2):
+                # a pipeline is reset by execute(), even a failed one, so it is rebuilt per attempt
+                pipeline = redis_client.pipeline(transaction = False)
+                for message in messages:
+                    pipeline.publish(channel = key, 
+                                     message = message)
+                started = time.perf_counter()
                 try:
-                    redis_client.publish(channel = key, 
-                                         message = message)
+                    pipeline.execute()
+                    published = True
+                    break
                 except Exception as e:
-                    print(f"Failed to publish to Redis: {e}")
-                    time.sleep(0.1)
+                    stats['failed_batches'] += 1
+                    if attempt > self.publish_max_retries:
+                        self.error(fr"Failed to publish to Redis, batch dropped | channel: {key} | messages: {len(batch)} | attempts: {attempt} | {e}")
+                        break
+                    stats['retries'] += 1
+                    self.error(fr"Failed to publish to Redis, retrying in {backoff:.3f}s | channel: {key} | messages: {len(batch)} | attempt: {attempt} | {e}")
+                    time.sleep(backoff)
+                    backoff *= 2
+            if not published:
+                stats['lost_messages'] += len(batch)
+                continue
+
+            latency = time.perf_counter() - started
+            stats['batches'] += 1
+            stats['messages'] += len(batch)
+            stats['batch_size_max'] = max(stats['batch_size_max'], len(batch))
+            stats['latency_total'] += latency
+            stats['latency_max'] = max(stats['latency_max'], latency)
+
+
+    def queue_metrics(self):
+        return {key: data_queue.metrics() for key, data_queue in self.data_queues.items()}
+
+    def publish_metrics(self):
+        """Batch sizes and pipeline round trip per channel, latencies in microseconds."""
+        metrics = {}
+        for key, stats in self.publish_stats.items():
+            batches = stats['batches']
+            metrics[key] = {
+                'batches': batches,
+                'messages': stats['messages'],
+                'failed_batches': stats['failed_batches'],
+                'retries': stats['retries'],
+                'lost_messages': stats['lost_messages'],
+                'batch_size_mean': stats['messages']/batches if batches else 0.0,
+                'batch_size_max': stats['batch_size_max'],
+                'latency_mean_us': (stats['latency_total']/batches)*1e6 if batches else 0.0,
+                'latency_max_us': stats['latency_max']*1e6,
+            }
+        return metrics
+
+    def persistence_metrics(self):
+        return {channel: {**writer.metrics(), 'bad_messages': self.listen_errors.get(channel, 0)}
+                for channel, writer in self.persistence_writers.items()}
+
+    def close_persistence(self):
+        """Stops the listeners once they read what was published, then flushes the writers."""
+        self.shutdown_flag = True
+        for thread in self.threads_redis_channels.values():
+            thread.join()
+        if self.indicator_thread is not None:
+            self.indicator_thread.join()
+        for writer in self.persistence_writers.values():
+            writer.close()
+
+    def close_queues(self):
+        """Closes the channel queues and waits for the publishers to send what is left."""
+        for data_queue in self.data_queues.values():
+            data_queue.close()
+        for thread in self.threads_deques.values():
+            thread.join()
 
 
     def listen_to_channel(self, 
@@ -153,25 +315,54 @@ class LowLatencyDataBase:
         pubsub = redis_client.pubsub()
         pubsub.subscribe(channel)
 
+        spill_path = None
+        if self.spill_dir:
+            os.makedirs(self.spill_dir, exist_ok = True)
+            spill_path = os.path.join(self.spill_dir, fr"{channel}.spill.jsonl")
+        writer = PersistenceWriter(collection = db,
+                                   flush_size = self.persist_batch_size,
+                                   flush_interval = self.persist_interval,
+                                   spill_path = spill_path,
+                                   logger = self)
+        self.persistence_writers[channel] = writer
+        self.listen_errors[channel] = 0
+
         while True:
-            for message in pubsub.listen():
-                if message['type'] == 'message':
-                    try:
-                        channel_byte_string = message['channel']
-                        data_byte_string = message['data']
-
-                        channel_string = channel_byte_string.decode('utf-8')
-                        data_string = data_byte_string.decode('utf-8')
-                        
-                        data_dict = json.loads(data_string)
-                        insert_data = {
-                            'channel_name': channel_string,
-                            'data': data_dict['data'],
-                            'time': data_dict['time']
-                        }
-
-                        print(f"Listening To Channel Function {data_dict}")
-                        db.insert_one(insert_data)
-
-                    except Exception as e:
-                        raise ValueError(fr"Error inserting data into {channel_string}")
+            # polls so the shutdown flag is seen, once it is set the listener stops as soon as
+            # nothing is left to read
+            message = pubsub.get_message(ignore_subscribe_messages = True, timeout = 1.0)
+            if message is None:
+                if self.shutdown_flag:
+                    break
+                continue
+            if message['type'] != 'message':
+                continue
+            try:
+                channel_byte_string = message['channel']
+                data_byte_string = message['data']
+
+                channel_string = channel_byte_string.decode('utf-8')
+
+                if self.raw_forwarding:
+                    # the only place a forwarded tick is parsed, 'time' is its receive time
+                    data_dict = decode(data_byte_string)
+                else:
+                    data_dict = json.loads(data_byte_string)
+                insert_data = {
+                    'channel_name': channel_string,
+                    'data': data_dict['data'],
+                    'time': data_dict['time']
+                }
+
+                writer.add(insert_data)
+
+            except Exception as e:
+                if writer.closed:
+                    self.warning(fr"Persistence writer for {channel} closed, listener stopped")
+                    break
+                # a bad message is counted and skipped, it must not stop the listener
+                self.listen_errors[channel] += 1
+                if self.listen_errors[channel] <= 10 or self.listen_errors[channel] % 1000 == 0:
+                    self.error(fr"Error inserting data into {channel} | errors so far: {self.listen_errors[channel]} | {e}")
+
+        pubsub.close()
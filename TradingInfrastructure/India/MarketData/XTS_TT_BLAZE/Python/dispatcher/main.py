@@ -0,0 +1,128 @@
+import queue
+import threading
+import time
+
+
+INSTRUMENT_KEY = '"ExchangeInstrumentID":'
+INSTRUMENT_KEY_BYTES = INSTRUMENT_KEY.encode()
+DIGITS = b'0123456789'
+
+
+def instrument_id(data):
+    """
+    ExchangeInstrumentID of a tick without decoding the JSON, None when the message has
+    none. bytes (e.g. a tick envelope) are searched as they are.
+    """
+    if isinstance(data, dict):
+        value = data.get('ExchangeInstrumentID')
+        return None if value is None or value == '' else int(value)
+    if isinstance(data, (bytes, bytearray)):
+        key, digits = INSTRUMENT_KEY_BYTES, DIGITS
+    elif isinstance(data, str):
+        key, digits = INSTRUMENT_KEY, '0123456789'
+    else:
+        return None
+
+    start = data.find(key)
+    if start < 0:
+        return None
+    start += len(key)
+    stop = start
+    while stop < len(data) and data[stop:stop + 1] in digits:
+        stop += 1
+    if stop == start:
+        return None
+    return int(data[start:stop])
+
+
+class EventDispatcher:
+    """
+    Hands the socket.io market data events to a fixed pool of worker threads instead of a
+    new thread per tick. Every instrument is pinned to one worker by its ExchangeInstrumentID,
+    so the ticks of an instrument are handled in the order they arrived while different
+    instruments run in parallel. Each worker has its own bounded queue; when a worker falls
+    that far behind dispatch() blocks the socket thread, which is the backpressure.
+
+    The handler is called with the wall clock time the event was received, in ns since the
+    epoch, so the raw forwarding path can stamp ticks with it.
+
+    metrics() reports the dispatch latency (enqueue to handler start) and the queue depths.
+    """
+    def __init__(self,
+                 handler = None,
+                 workers = 4,
+                 queue_size = 10000):
+        if handler is None:
+            raise ValueError("No handler passed to EventDispatcher")
+
+        self.handler = handler
+        self.workers = max(int(workers), 1)
+        self.queues = [queue.Queue(maxsize = queue_size) for _ in range(self.workers)]
+        self.lock = threading.Lock()
+        self.reset_metrics()
+
+        self.threads = []
+        for index in range(self.workers):
+            thread = threading.Thread(target = self.worker_loop, args = (index,), daemon = True)
+            self.threads.append(thread)
+            thread.start()
+
+    def dispatch(self, key, data):
+        # messages without an instrument all go to the first worker, in their order
+        index = (instrument_id(data) or 0) % self.workers
+        self.queues[index].put((key, data, time.perf_counter(), time.time_ns()))
+
+    def worker_loop(self, index):
+        events = self.queues[index]
+        while True:
+            item = events.get()
+            if item is None:
+                return
+            key, data, enqueued, received_ns = item
+            latency = time.perf_counter() - enqueued
+            depth = events.qsize()
+
+            with self.lock:
+                self.dispatched += 1
+                self.latency_total += latency
+                self.latency_max = max(self.latency_max, latency)
+                self.depth_max = max(self.depth_max, depth)
+
+            try:
+                self.handler(key, data, received_ns)
+            except Exception as e:
+                with self.lock:
+                    self.errors += 1
+                    self.last_error = fr"{key}: {e}"
+
+    def reset_metrics(self):
+        with self.lock:
+            self.dispatched = 0
+            self.errors = 0
+            self.last_error = None
+            self.latency_total = 0.0
+            self.latency_max = 0.0
+            self.depth_max = 0
+
+    def metrics(self, reset = False):
+        """Counts and latencies since the last reset, latencies in microseconds."""
+        with self.lock:
+            metrics = {
+                'dispatched': self.dispatched,
+                'errors': self.errors,
+                'last_error': self.last_error,
+                'latency_mean_us': (self.latency_total/self.dispatched)*1e6 if self.dispatched else 0.0,
+                'latency_max_us': self.latency_max*1e6,
+                'queue_depths': [events.qsize() for events in self.queues],
+                'queue_depth_max': self.depth_max,
+            }
+        if reset:
+            self.reset_metrics()
+        return metrics
+
+    def stop(self):
+        """Lets the workers finish what is queued and stops them."""
+        for events in self.queues:
+            events.put(None)
+        for thread in self.threads:
+            thread.join()
@@ -0,0 +1,121 @@
+import os
+import sys
+import json
+import time
+import threading
+
+# Just pointing the path to the backtest options dir so the live feed runs the same indicators
+options_dir = os.path.abspath(os.path.join(os.path.dirname(__file__),
+                                           os.pardir, os.pardir, os.pardir, os.pardir, os.pardir, os.pardir,
+                                           'BackTestingFrameWork', 'python', 'options'))
+
+sys.path.append(options_dir)
+
+from indicators.main import RelativeStrengthIndex, SimpleMovingAverage
+from tick_envelope.main import decode, is_envelope
+from dispatcher.main import instrument_id
+
+
+class LiveIndicators:
+    """
+    Runs the backtest DMA and RSI (options/indicators, objective_three) on the published
+    touchline ticks. The backtests compute them on one minute closes, so the last traded
+    price of every instrument is kept for the running minute and its close goes through
+    update() once the minute is over, constant time per bar whatever the tick rate.
+
+    The ticks are read from a redis channel in either publish format (tick envelope or the
+    JSON message), the minute is taken from the time the tick was received. values() has
+    the latest close, dma and rsi of every instrument.
+    """
+    def __init__(self,
+                 window = 30,
+                 bar_seconds = 60,
+                 logger = None):
+        self.window = int(window)
+        self.bar_seconds = int(bar_seconds)
+        self.logger = logger
+
+        self.dma = {}
+        self.rsi = {}
+        self.bar = {}
+        self.latest = {}
+        self.lock = threading.Lock()
+        self.bars = 0
+        self.skipped = 0
+
+    def log(self, level, message):
+        if self.logger is not None:
+            getattr(self.logger, level)(message)
+        else:
+            print(message)
+
+    @staticmethod
+    def last_traded_price(data):
+        touchline = data.get('Touchline', data)
+        price = touchline.get('LastTradedPrice')
+        return None if price is None else float(price)
+
+    def on_tick(self, data, received_ns = None):
+        """Adds one decoded tick, closes the instrument's previous minute when a new one starts."""
+        instrument = instrument_id(data)
+        price = self.last_traded_price(data)
+        if instrument is None or price is None:
+            self.skipped += 1
+            return
+        if received_ns is None:
+            received_ns = time.time_ns()
+        bar_index = received_ns//(self.bar_seconds*10**9)
+
+        with self.lock:
+            current = self.bar.get(instrument)
+            if current is not None and current[0] != bar_index:
+                self.close_bar(instrument, current[1])
+            self.bar[instrument] = (bar_index, price)
+
+    def close_bar(self, instrument, close):
+        if instrument not in self.dma:
+            self.dma[instrument] = SimpleMovingAverage(window = self.window)
+            self.rsi[instrument] = RelativeStrengthIndex(window = self.window)
+        self.latest[instrument] = {'close': close,
+                                   'dma': self.dma[instrument].update(close),
+                                   'rsi': self.rsi[instrument].update(close)}
+        self.bars += 1
+
+    def values(self, instrument = None):
+        with self.lock:
+            if instrument is not None:
+                return self.latest.get(instrument)
+            return dict(self.latest)
+
+    def on_message(self, message):
+        """Decodes one published message in either format and adds its tick."""
+        if is_envelope(message):
+            decoded = decode(message)
+            self.on_tick(decoded['data'], decoded['received_ns'])
+        else:
+            self.on_tick(json.loads(message)['data'])
+
+    def listen(self, pubsub = None, stop = None):
+        """
+        Feeds the messages of an already subscribed pubsub until stop() is true and nothing
+        is left to read, a bad message is logged and skipped
+        """
+        while True:
+            message = pubsub.get_message(ignore_subscribe_messages = True, timeout = 1.0)
+            if message is None:
+                if stop is not None and stop():
+                    break
+                continue
+            if message['type'] != 'message':
+                continue
+            try:
+                self.on_message(message['data'])
+            except Exception as e:
+                self.skipped += 1
+                if self.skipped <= 10 or self.skipped % 1000 == 0:
+                    self.log('error', fr"Bad tick for the live indicators | skipped so far: {self.skipped} | {e}")
+        pubsub.close()
+
+    def metrics(self):
+        with self.lock:
+            return {'instruments': len(self.bar), 'bars': self.bars, 'skipped': self.skipped}
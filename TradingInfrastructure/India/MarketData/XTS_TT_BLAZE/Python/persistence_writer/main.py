@@ -0,0 +1,201 @@
+import os
+import threading
+import time
+from bson import ObjectId, json_util
+from pymongo.errors import BulkWriteError
+
+
+class PersistenceWriter:
+    """
+    Batches the live ticks of one channel into its Mongo collection. add() only appends to
+    a buffer, a background thread flushes it with one unordered insert_many once flush_size
+    documents are buffered or the oldest one has waited flush_interval seconds.
+
+    A failed flush is retried max_retries times with a growing backoff. The documents get
+    their _id before the first attempt, so a retry after a partial insert only hits
+    duplicate key errors for the ones already stored, and those count as written. When Mongo
+    stays down the batch is appended to spill_path (one extended JSON document per line) and
+    the writer moves on with the live feed. replay_spill() inserts the spilled documents
+    once Mongo is back, the flush thread runs it first when the writer starts, so add()
+    buffers the live ticks meanwhile instead of waiting for the replay.
+
+    metrics() reports flushes, documents, retries, spills, flush latency and the lag of the
+    persisted data behind the feed (age of the oldest document of a batch when it is stored).
+    """
+    duplicate_key_error = 11000
+
+    def __init__(self,
+                 collection = None,
+                 flush_size = 1000,
+                 flush_interval = 0.5,
+                 max_retries = 3,
+                 retry_backoff = 0.2,
+                 spill_path = None,
+                 logger = None):
+        if collection is None:
+            raise ValueError("No collection passed to PersistenceWriter")
+
+        self.collection = collection
+        self.flush_size = max(int(flush_size), 1)
+        self.flush_interval = float(flush_interval)
+        self.max_retries = int(max_retries)
+        self.retry_backoff = float(retry_backoff)
+        self.spill_path = spill_path
+        self.logger = logger
+
+        self.buffer = []
+        self.oldest = None
+        self.condition = threading.Condition()
+        self.closed = False
+
+        self.flushes = 0
+        self.documents = 0
+        self.retries = 0
+        self.failed_flushes = 0
+        self.spilled = 0
+        self.flush_latency_total = 0.0
+        self.flush_latency_max = 0.0
+        self.lag_last = 0.0
+        self.lag_max = 0.0
+
+        self.thread = threading.Thread(target = self.flush_loop, daemon = True)
+        self.thread.start()
+
+    def log(self, level, message):
+        if self.logger is not None:
+            getattr(self.logger, level)(message)
+        else:
+            print(message)
+
+    def add(self, document):
+        with self.condition:
+            if self.closed:
+                raise RuntimeError(fr"PersistenceWriter for {self.collection.name} is closed")
+            if not self.buffer:
+                self.oldest = time.perf_counter()
+            self.buffer.append(document)
+            if len(self.buffer) >= self.flush_size:
+                self.condition.notify()
+
+    def flush_loop(self):
+        try:
+            self.replay_spill()
+        except Exception as e:
+            self.log('error', fr"Replaying {self.spill_path} into {self.collection.name} failed: {e}")
+        while True:
+            with self.condition:
+                while not self.closed and len(self.buffer) < self.flush_size:
+                    if self.buffer:
+                        remaining = self.oldest + self.flush_interval - time.perf_counter()
+                        if remaining <= 0:
+                            break
+                        self.condition.wait(timeout = remaining)
+                    else:
+                        self.condition.wait()
+                if self.closed and not self.buffer:
+                    return
+                batch, oldest = self.buffer[:self.flush_size], self.oldest
+                self.buffer = self.buffer[self.flush_size:]
+                # the rest arrived after the batch, its oldest is at most as old
+                self.oldest = oldest if self.buffer else None
+
+            self.write_batch(batch, oldest)
+
+    def insert_batch(self, batch):
+        """Unordered insert_many where documents which are already stored count as written."""
+        try:
+            self.collection.insert_many(batch, ordered = False)
+        except BulkWriteError as e:
+            errors = e.details.get('writeErrors', [])
+            if any(error.get('code') != self.duplicate_key_error for error in errors) or e.details.get('writeConcernErrors'):
+                raise
+
+    def write_batch(self, batch, oldest = None):
+        for document in batch:
+            document.setdefault('_id', ObjectId())
+
+        started = time.perf_counter()
+        for attempt in range(self.max_retries + 1):
+            try:
+                self.insert_batch(batch)
+                break
+            except Exception as e:
+                if attempt == self.max_retries:
+                    self.failed_flushes += 1
+                    self.spill(batch, e)
+                    return
+                self.retries += 1
+                self.log('warning', fr"Insert into {self.collection.name} failed, retry {attempt + 1} of {self.max_retries}: {e}")
+                time.sleep(self.retry_backoff*(2**attempt))
+
+        finished = time.perf_counter()
+        latency = finished - started
+        lag = finished - oldest if oldest is not None else 0.0
+        self.flushes += 1
+        self.documents += len(batch)
+        self.flush_latency_total += latency
+        self.flush_latency_max = max(self.flush_latency_max, latency)
+        self.lag_last = lag
+        self.lag_max = max(self.lag_max, lag)
+
+    def spill(self, batch, error = None):
+        if self.spill_path is None:
+            self.log('error', fr"Dropped {len(batch)} documents for {self.collection.name}, Mongo failed and no spill file is set: {error}")
+            return
+        with open(self.spill_path, 'a') as f:
+            for document in batch:
+                f.write(json_util.dumps(document))
+                f.write('\n')
+        self.spilled += len(batch)
+        self.log('error', fr"Spilled {len(batch)} documents for {self.collection.name} to {self.spill_path}: {error}")
+
+    def replay_spill(self):
+        """Inserts the spilled documents and removes the spill file, it is kept if Mongo is still down."""
+        if self.spill_path is None or not os.path.exists(self.spill_path):
+            return 0
+
+        replay_path = fr"{self.spill_path}.replay"
+        os.replace(self.spill_path, replay_path)
+        with open(replay_path) as f:
+            documents = [json_util.loads(line) for line in f if line.strip()]
+
+        try:
+            for start in range(0, len(documents), self.flush_size):
+                self.insert_batch(documents[start:start + self.flush_size])
+        except Exception as e:
+            with open(self.spill_path, 'a') as f:
+                for document in documents:
+                    f.write(json_util.dumps(document))
+                    f.write('\n')
+            os.remove(replay_path)
+            self.log('error', fr"Replaying {self.spill_path} into {self.collection.name} failed, kept for the next start: {e}")
+            return 0
+
+        os.remove(replay_path)
+        self.log('info', fr"Replayed {len(documents)} spilled documents into {self.collection.name}")
+        return len(documents)
+
+    def close(self):
+        """Flushes what is buffered and stops the flush thread."""
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+        self.thread.join()
+
+    def metrics(self):
+        with self.condition:
+            buffered = len(self.buffer)
+            age = time.perf_counter() - self.oldest if self.oldest is not None else 0.0
+        return {
+            'flushes': self.flushes,
+            'documents': self.documents,
+            'buffered': buffered,
+            'buffered_age_ms': age*1e3,
+            'retries': self.retries,
+            'failed_flushes': self.failed_flushes,
+            'spilled': self.spilled,
+            'flush_latency_mean_ms': (self.flush_latency_total/self.flushes)*1e3 if self.flushes else 0.0,
+            'flush_latency_max_ms': self.flush_latency_max*1e3,
+            'lag_last_ms': self.lag_last*1e3,
+            'lag_max_ms': self.lag_max*1e3,
+        }
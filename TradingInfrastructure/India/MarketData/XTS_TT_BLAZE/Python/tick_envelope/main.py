@@ -0,0 +1,85 @@
+import json
+import struct
+import time
+from datetime import datetime
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+# magic, version, payload codec, receive time in ns since the epoch, payload length
+HEADER = struct.Struct('<2sBBqI')
+MAGIC = b'XT'
+VERSION = 1
+CODEC_JSON = 0
+CODEC_MSGPACK = 1
+
+
+def pack(payload, received_ns = None, codec = CODEC_JSON):
+    """
+    Envelope of one tick: the fixed header followed by the payload exactly as it came off
+    the socket, a str is only encoded to utf-8 and never parsed. received_ns defaults to now.
+    """
+    if isinstance(payload, str):
+        payload = payload.encode('utf-8')
+    elif isinstance(payload, (dict, list)):
+        payload = dumps(payload)
+    if received_ns is None:
+        received_ns = time.time_ns()
+    return HEADER.pack(MAGIC, VERSION, codec, received_ns, len(payload)) + payload
+
+
+def unpack(message):
+    """(received_ns, codec, payload) of an envelope, the payload is a memoryview into message."""
+    if len(message) < HEADER.size:
+        raise ValueError(fr"Tick envelope too short: {len(message)} bytes")
+    magic, version, codec, received_ns, length = HEADER.unpack_from(message)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(fr"Not a tick envelope: magic {magic!r} version {version}")
+    payload = memoryview(message)[HEADER.size:HEADER.size + length]
+    if len(payload) != length:
+        raise ValueError(fr"Truncated tick envelope: {len(payload)} of {length} payload bytes")
+    return received_ns, codec, payload
+
+
+def is_envelope(message):
+    return isinstance(message, (bytes, bytearray, memoryview)) and bytes(message[:2]) == MAGIC
+
+
+def dumps(data):
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, separators = (',', ':')).encode('utf-8')
+
+
+def loads(payload, codec = CODEC_JSON):
+    """Decodes a payload with orjson when it is installed, the json module otherwise."""
+    if codec == CODEC_MSGPACK:
+        if msgpack is None:
+            raise ValueError("msgpack payload received but msgpack is not installed")
+        return msgpack.unpackb(payload, raw = False)
+    if codec != CODEC_JSON:
+        raise ValueError(fr"Unknown tick envelope codec {codec}")
+    if orjson is not None:
+        return orjson.loads(payload)
+    return json.loads(bytes(payload))
+
+
+def time_string(received_ns):
+    """Receive time in the format of the legacy 'time' field, HH:MM:SS.fffff"""
+    return datetime.fromtimestamp(received_ns/1e9).strftime("%H:%M:%S.%f")[:-1]
+
+
+def decode(message):
+    """{'time', 'received_ns', 'data'} of an envelope, the one place its payload is parsed."""
+    received_ns, codec, payload = unpack(message)
+    return {'time': time_string(received_ns),
+            'received_ns': received_ns,
+            'data': loads(payload, codec = codec)}
@@ -0,0 +1,135 @@
+import itertools
+import threading
+import time
+from collections import OrderedDict
+
+
+class TickQueue:
+    """
+    Bounded queue between the socket handlers and the per channel publisher threads. get()
+    sleeps on a condition until a tick arrives, so an idle channel costs no CPU, and what
+    happens when the consumer falls maxsize ticks behind is the overflow policy:
+    - block: put() waits for room, nothing is lost and the producer is slowed down
+    - drop_oldest: the oldest queued tick is dropped to make room for the new one
+    - conflate: a tick replaces the one still queued for the same instrument (key_function)
+      in its place in the queue, so a slow consumer only sees the latest state of every
+      instrument, when the queue is full of distinct instruments the oldest is dropped.
+      A message key_function returns None for (no instrument) is never conflated.
+
+    The counters (puts, gets, drops, conflated, high water mark) are read with metrics().
+    """
+    policies = ('block', 'drop_oldest', 'conflate')
+
+    def __init__(self,
+                 maxsize = 10000,
+                 policy = 'block',
+                 key_function = None):
+        if policy not in self.policies:
+            raise ValueError(fr"Unknown overflow policy {policy}, has to be one of {self.policies}")
+        if policy == 'conflate' and key_function is None:
+            raise ValueError("The conflate policy needs a key_function")
+
+        self.maxsize = max(int(maxsize), 1)
+        self.policy = policy
+        self.key_function = key_function
+        self.items = OrderedDict()
+        self.sequence = itertools.count()
+        self.condition = threading.Condition()
+        self.closed = False
+
+        self.puts = 0
+        self.gets = 0
+        self.drops = 0
+        self.conflated = 0
+        self.high_water = 0
+
+    def __len__(self):
+        with self.condition:
+            return len(self.items)
+
+    def put(self, item):
+        key = self.key_function(item) if self.policy == 'conflate' else None
+        if key is None:
+            # a tuple never equals an instrument key, so sequenced items are never replaced
+            key = ('sequence', next(self.sequence))
+        with self.condition:
+            if self.closed:
+                return False
+            self.puts += 1
+
+            if self.policy == 'conflate' and key in self.items:
+                self.items[key] = item
+                self.conflated += 1
+                return True
+
+            if len(self.items) >= self.maxsize:
+                if self.policy == 'block':
+                    while len(self.items) >= self.maxsize and not self.closed:
+                        self.condition.wait()
+                    if self.closed:
+                        return False
+                else:
+                    self.items.popitem(last = False)
+                    self.drops += 1
+
+            self.items[key] = item
+            self.high_water = max(self.high_water, len(self.items))
+            self.condition.notify_all()
+            return True
+
+    def get(self, timeout = None):
+        """Oldest tick, waits for one. None when the queue is closed and empty or on timeout."""
+        with self.condition:
+            if not self.condition.wait_for(lambda: self.items or self.closed, timeout = timeout):
+                return None
+            if not self.items:
+                return None
+            _, item = self.items.popitem(last = False)
+            self.gets += 1
+            self.condition.notify_all()
+            return item
+
+    def get_batch(self, max_items = 500, max_wait = 0.001):
+        """
+        Waits for the first tick, then takes whatever else is queued until max_items are
+        taken or max_wait seconds have passed since the first one. An empty list means the
+        queue was closed.
+        """
+        batch = []
+        first = self.get()
+        if first is None:
+            return batch
+        batch.append(first)
+
+        deadline = time.perf_counter() + max_wait
+        with self.condition:
+            while len(batch) < max_items:
+                if not self.items:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0 or self.closed:
+                        break
+                    self.condition.wait(timeout = remaining)
+                    continue
+                _, item = self.items.popitem(last = False)
+                batch.append(item)
+                self.gets += 1
+            self.condition.notify_all()
+        return batch
+
+    def close(self):
+        """Wakes every waiting thread, the consumers drain what is left and stop."""
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+    def metrics(self):
+        with self.condition:
+            return {
+                'policy': self.policy,
+                'depth': len(self.items),
+                'puts': self.puts,
+                'gets': self.gets,
+                'drops': self.drops,
+                'conflated': self.conflated,
+                'high_water': self.high_water,
+            }
@@ -35,6 +35,8 @@ from subscribe.main import SubscribedInstruments
 from config.xts_message_codes.main import XtsMessageCodes
 from auth.main import MarketDataApiCredentials
 from dbProcess.main import LowLatencyDataBase
+from dispatcher.main import EventDispatcher
+from tick_envelope.main import pack
 
 
 import asyncio
@@ -224,6 +226,12 @@ class WebSocket(
     
 
     def start(self):
+        # ticks go to a fixed pool of workers pinned per instrument instead of a thread per tick,
+        # dispatch_workers and dispatch_queue_size can be set through websoc_class_attr
+        self.dispatcher = EventDispatcher(handler = self.handle_data_event,
+                                          workers = getattr(self, 'dispatch_workers', 4),
+                                          queue_size = getattr(self, 'dispatch_queue_size', 10000))
+
         self.socket = socketio.Client(reconnection=True,
                                       reconnection_attempts=10,
                                       reconnection_delay=1)
@@ -251,27 +259,27 @@ class WebSocket(
 
         @self.socket.on('1501-json-full')
         def on_1501_json_full(data):
-            threading.Thread(target=self.handle_data_event, args=("1501-json-full", data)).start()
+            self.dispatcher.dispatch("1501-json-full", data)
 
         @self.socket.on('1502-json-full')
         def on_1502_json_full(data):
-            threading.Thread(target=self.handle_data_event, args=("1502-json-full", data)).start()
+            self.dispatcher.dispatch("1502-json-full", data)
 
         @self.socket.on('1505-json-full')
         def on_1505_json_full(data):
-            threading.Thread(target=self.handle_data_event, args=("1505-json-full", data)).start()
+            self.dispatcher.dispatch("1505-json-full", data)
 
         @self.socket.on('1510-json-full')
         def on_1510_json_full(data):
-            threading.Thread(target=self.handle_data_event, args=("1510-json-full", data)).start()
+            self.dispatcher.dispatch("1510-json-full", data)
 
         @self.socket.on('1512-json-full')
         def on_1512_json_full(data):
-            threading.Thread(target=self.handle_data_event, args=("1512-json-full", data)).start()
+            self.dispatcher.dispatch("1512-json-full", data)
 
         @self.socket.on('1105-json-full')
         def on_1105_json_full(data):
-            threading.Thread(target=self.handle_data_event, args=("1105-json-full", data)).start()
+            self.dispatcher.dispatch("1105-json-full", data)
 
         self.socket.wait()
 
@@ -284,9 +292,12 @@ class WebSocket(
     def handle_disconnect(self):
         self.warning("WebSocket Disconnected To XTS Market Data")
 
-    def handle_data_event(self, key, data):
+    def handle_data_event(self, key, data, received_ns=None):
         self.info(f"{key} | Data Received")
-        self.data_deques[key].append(data)
+        if self.raw_forwarding:
+            # the payload is forwarded as received, stamped with the time it came off the socket
+            data = pack(data, received_ns = received_ns)
+        self.data_queues[key].put(data)
 
 
 
@@ -316,8 +327,23 @@ class WebSocket(
                     self.info("Logged Out From The check_time_and_stop() function | check 3")
                     self.socket.disconnect(bool(True))
                     self.warning("Socket Disconnected")
+                    self.dispatcher.stop()
+                    self.info(fr"Dispatcher stopped | metrics: {self.dispatcher.metrics()}")
+                    self.close_queues()
+                    self.info(fr"Channel queues closed | metrics: {self.queue_metrics()}")
+                    self.close_persistence()
+                    self.info(fr"Persistence writers flushed | metrics: {self.persistence_metrics()}")
                     break
 
+            if getattr(self, 'dispatcher', None) is not None:
+                self.info(fr"Dispatch metrics: {self.dispatcher.metrics(reset = True)}")
+            if getattr(self, 'data_queues', None) is not None:
+                self.info(fr"Channel queue metrics: {self.queue_metrics()}")
+                self.info(fr"Redis publish metrics: {self.publish_metrics()}")
+                self.info(fr"Mongo persistence metrics: {self.persistence_metrics()}")
+                if self.live_indicators is not None:
+                    self.info(fr"Live indicator metrics: {self.indicator_metrics()}")
+
             self.info(fr"Sleeping check_time_and_stop function EOD unreached | Going to sleep for {sleep_time} seconds")
             time.sleep(int(sleep_time))
 